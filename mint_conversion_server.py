@@ -0,0 +1,310 @@
+"""
+Mint Conversion Server
+Local HTTP service: upload Mint Excel/CSV → JSON แยกตาม category slug
+
+Endpoints:
+- POST /convert     body = ไฟล์ xlsx/csv (raw bytes หรือ multipart/form-data field "file")
+    ?filename=...   ชื่อไฟล์ ใช้เลือก reader (default: upload.xlsx)
+    ?format=zip     (default) ZIP ที่มี {slug}.json ทุก category
+    ?format=json    JSON object {slug: service definition}
+    ?slug=...       ส่งกลับเฉพาะ category นี้เป็น JSON (แปลงเฉพาะ category นี้)
+    ?dedup=1        รวม configurations ที่ซ้ำกันไว้ใน definitions ($ref)
+    ?minify=1       JSON แบบ minified (ไม่มี indent)
+    ?precompress=1  ZIP มี {slug}.json.gz (+ .br/.zst ถ้าติดตั้ง) และ sizes.json;
+                    ?slug=... ส่ง gzip ให้ client ที่ Accept-Encoding: gzip
+- GET /metrics      queue depth, in-flight, counters, latency percentiles
+- GET /health
+
+Run:
+    python mint_conversion_server.py --port 8765 --workers 2 --max-pending 8
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from mint_excel_to_json_converter_lib import encode_workbook, nearest_rank, workbook_output_files
+
+def build_zip(files: Dict[str, bytes]) -> bytes:
+    """Pack output files into a ZIP archive (already-compressed variants are stored as-is)"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, payload in files.items():
+            compression = zipfile.ZIP_DEFLATED if name.endswith('.json') else zipfile.ZIP_STORED
+            archive.writestr(name, payload, compress_type=compression)
+    return buffer.getvalue()
+
+def extract_upload(body: bytes, content_type: str, default_filename: str) -> Tuple[bytes, str]:
+    """Return (file bytes, filename) from a raw or multipart/form-data request body"""
+    if not content_type.lower().startswith('multipart/form-data'):
+        return body, default_filename
+
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + body
+    )
+    for part in message.iter_parts():
+        filename = part.get_filename()
+        if filename or part.get_param('name', header='content-disposition') == 'file':
+            return part.get_payload(decode=True) or b'', filename or default_filename
+    raise ValueError("multipart body has no file field")
+
+def is_enabled(value: Optional[str]) -> bool:
+    """Query-string flag: 1 / true / yes"""
+    return (value or '').lower() in ('1', 'true', 'yes')
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values), nearest_rank(len(sorted_values), pct)) - 1]
+
+class ServerMetrics:
+    """Thread-safe counters and a rolling latency window"""
+
+    def __init__(self, workers: int, window: int = 1000):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=window)
+
+    def start(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def finish(self, seconds: float, ok: bool):
+        with self.lock:
+            self.in_flight -= 1
+            if ok:
+                self.completed += 1
+                self.latencies.append(seconds)
+            else:
+                self.failed += 1
+
+    def reject(self):
+        with self.lock:
+            self.rejected += 1
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            latencies = sorted(self.latencies)
+            in_flight = self.in_flight
+            counters = {
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected
+            }
+
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "workers": self.workers,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.workers),
+            **counters,
+            "latency_ms": {
+                "count": len(latencies),
+                "p50": ms(percentile(latencies, 50)),
+                "p90": ms(percentile(latencies, 90)),
+                "p99": ms(percentile(latencies, 99)),
+                "max": ms(latencies[-1] if latencies else None)
+            }
+        }
+
+class ConversionServer(ThreadingHTTPServer):
+    """HTTP server that hands conversions to a bounded process pool"""
+
+    daemon_threads = True
+
+    def __init__(self, address, workers: int = 2, max_pending: int = 8,
+                 max_upload_bytes: int = 20 * 1024 * 1024):
+        super().__init__(address, ConversionRequestHandler)
+        self.workers = workers
+        self.executor_lock = threading.Lock()
+        self.executor = self.new_executor()
+        # Requests beyond this many in flight get 503 instead of queueing forever
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.max_upload_bytes = max_upload_bytes
+        self.metrics = ServerMetrics(workers)
+
+    def new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def replace_broken_executor(self, broken: ProcessPoolExecutor):
+        """A dead worker breaks the pool for good; swap in a fresh one (once, however many requests saw it)"""
+        with self.executor_lock:
+            if self.executor is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.executor = self.new_executor()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    server_version = "MintConversionServer/1.0"
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/metrics':
+            self.send_json(200, self.server.metrics.snapshot())
+        elif path == '/health':
+            self.send_json(200, {"status": "ok"})
+        else:
+            self.send_json(404, {"error": f"not found: {path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/convert':
+            self.send_json(404, {"error": f"not found: {url.path}"})
+            return
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        output_format = params.get('format', 'zip').lower()
+        slug = params.get('slug')
+        dedup = is_enabled(params.get('dedup'))
+        minify = is_enabled(params.get('minify'))
+        precompress = is_enabled(params.get('precompress'))
+        if output_format not in ('zip', 'json'):
+            self.send_json(400, {"error": "format must be 'zip' or 'json'"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self.send_json(400, {"error": "invalid Content-Length"})
+            return
+        if length <= 0:
+            self.send_json(400, {"error": "empty request body"})
+            return
+        if length > self.server.max_upload_bytes:
+            self.send_json(413, {"error": f"upload larger than {self.server.max_upload_bytes} bytes"})
+            return
+        body = self.rfile.read(length)
+
+        try:
+            data, filename = extract_upload(
+                body,
+                self.headers.get('Content-Type', ''),
+                params.get('filename', 'upload.xlsx')
+            )
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        # Backpressure: refuse instead of queueing unbounded work
+        if not self.server.slots.acquire(blocking=False):
+            self.server.metrics.reject()
+            self.send_json(503, {"error": "server busy, retry later"}, {"Retry-After": "1"})
+            return
+
+        metrics = self.server.metrics
+        metrics.start()
+        started = time.perf_counter()
+        executor = self.server.executor
+        try:
+            outputs = executor.submit(
+                # With ?slug=... only that category is converted
+                encode_workbook, data, filename, dedup, minify, precompress, [slug] if slug else None
+            ).result()
+        except BrokenProcessPool:
+            self.server.replace_broken_executor(executor)
+            metrics.finish(time.perf_counter() - started, ok=False)
+            self.send_json(500, {"error": "conversion worker crashed, retry later"}, {"Retry-After": "1"})
+            return
+        except Exception as e:
+            metrics.finish(time.perf_counter() - started, ok=False)
+            self.send_json(422, {"error": f"conversion failed: {e}"})
+            return
+        finally:
+            self.server.slots.release()
+
+        if slug and slug not in outputs:
+            # Not a completed conversion: keep it out of the latency window
+            metrics.finish(time.perf_counter() - started, ok=False)
+            self.send_json(404, {"error": f"category slug not found: {slug}"})
+            return
+        metrics.finish(time.perf_counter() - started, ok=True)
+
+        if slug:
+            output = outputs[slug]
+            if '.gz' in output['compressed'] and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                self.send_bytes(200, output['compressed']['.gz'], 'application/json; charset=utf-8',
+                                {"Content-Encoding": "gzip"})
+            else:
+                self.send_bytes(200, output['json'], 'application/json; charset=utf-8')
+        elif output_format == 'json':
+            payload = b'{' + b','.join(
+                json.dumps(key, ensure_ascii=False).encode('utf-8') + b':' + output['json']
+                for key, output in outputs.items()
+            ) + b'}'
+            self.send_bytes(200, payload, 'application/json; charset=utf-8')
+        else:
+            files = workbook_output_files(outputs)
+            if precompress:
+                files['sizes.json'] = json.dumps(
+                    {key: output['sizes'] for key, output in outputs.items()}, indent=2
+                ).encode('utf-8')
+            self.send_bytes(200, build_zip(files), 'application/zip',
+                            {"Content-Disposition": 'attachment; filename="service_definitions.zip"'})
+
+    def send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_bytes(status, body, 'application/json; charset=utf-8', headers)
+
+    def send_bytes(self, status: int, body: bytes, content_type: str,
+                   headers: Optional[Dict[str, str]] = None, chunk_size: int = 64 * 1024):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        view = memoryview(body)
+        for offset in range(0, len(body), chunk_size):
+            self.wfile.write(view[offset:offset + chunk_size])
+
+def main():
+    parser = argparse.ArgumentParser(description="Mint Excel → JSON conversion server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help="จำนวน worker process")
+    parser.add_argument('--max-pending', type=int, default=8,
+                        help="จำนวน request ที่รับพร้อมกันได้ก่อนตอบ 503")
+    parser.add_argument('--max-upload-mb', type=int, default=20)
+    args = parser.parse_args()
+
+    server = ConversionServer(
+        (args.host, args.port),
+        workers=args.workers,
+        max_pending=args.max_pending,
+        max_upload_bytes=args.max_upload_mb * 1024 * 1024
+    )
+    print(f"🚀 Mint conversion server on http://{args.host}:{args.port} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
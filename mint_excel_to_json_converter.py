@@ -9,20 +9,22 @@ Flow:
 """
 
 import streamlit as st
-import pandas as pd
-import json
+import hashlib
+import time
 
-# Force cache invalidation - v2.1 - 2026-01-15 17:30
-import importlib
-import sys
-if 'mint_excel_to_json_converter_lib' in sys.modules:
-    importlib.reload(sys.modules['mint_excel_to_json_converter_lib'])
+# No importlib.reload of the library here: Streamlit already re-imports edited local
+# modules, and a reload on every rerun would drop the compiled schema validator cache
 
 from mint_excel_to_json_converter_lib import (
-    convert_mint_excel_to_json,
-    create_inline_text,
-    create_i18n_text,
-    parse_configuration_text
+    CompactResultStore,
+    catalog_sqlite_bytes,
+    category_price_report,
+    category_results_stats,
+    iter_split_by_category,
+    price_report_csv,
+    read_mint_file,
+    LazyCategoryResults,
+    prepare_mint_frame
 )
 
 st.set_page_config(
@@ -83,293 +85,6 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-def split_by_category(df):
-    """แยก JSON ตาม Category slug"""
-    
-    # Set headers
-    headers = df.iloc[0].tolist()
-    df_data = df.iloc[1:].copy()
-    df_data.columns = headers
-    df_data.columns = df_data.columns.str.strip()
-    
-    # Forward fill Category slug for rows that don't have it (inherit from previous row)
-    df_data['Category slug filled'] = df_data['Category slug'].ffill()
-    
-    # Get unique categories
-    categories = df_data[df_data['Category slug filled'].notna()]['Category slug filled'].unique()
-    
-    results = {}
-    
-    for category_slug in categories:
-        # Filter data for this category using filled category slug
-        mask = (df_data['Category slug filled'] == category_slug)
-        
-        # Also include rows where Package Name is empty (additional configurations)
-        # by looking at previous row
-        indices_to_include = set()
-        for idx in df_data[mask].index:
-            indices_to_include.add(idx)
-            # Check next row
-            next_idx = idx + 1
-            while next_idx in df_data.index:
-                next_row = df_data.loc[next_idx]
-                # If Package Name is empty, include this row
-                if pd.isna(next_row.get('Package Name')) or not str(next_row.get('Package Name', '')).strip():
-                    indices_to_include.add(next_idx)
-                    next_idx += 1
-                else:
-                    break
-        
-        category_data = df_data.loc[sorted(indices_to_include)]
-        
-        if category_data.empty:
-            continue
-        
-        # Get category info
-        category_rows = category_data[category_data['Category'].notna()]
-        if len(category_rows) > 0:
-            first_row = category_rows.iloc[0]
-            category_name = first_row.get('Category', category_slug)
-            
-            subcat_thai = None
-            for col in df_data.columns:
-                if 'subcat' in col.lower() and 'thai' in col.lower():
-                    subcat_thai = first_row.get(col, '')
-                    break
-            if not subcat_thai:
-                subcat_thai = category_name
-                
-            cart_limit = int(first_row.get('Cart limit', 30)) if pd.notna(first_row.get('Cart limit')) else 30
-        else:
-            first_row = category_data.iloc[0]
-            category_name = category_slug.replace('-', ' ').title()
-            subcat_thai = category_name
-            cart_limit = 30
-        
-        # Build packages
-        packages = []
-        current_package = None
-        
-        for idx, row in category_data.iterrows():
-            # Check if this is a new package (has Package Name)
-            has_package_name = pd.notna(row.get('Package Name')) and str(row.get('Package Name')).strip()
-            
-            if has_package_name:
-                # Save previous package if exists
-                if current_package:
-                    packages.append(current_package)
-                
-                # Start new package
-                package_name = str(row['Package Name']).strip()
-                package_id = str(row['Package Id']).strip()
-                
-                if not package_name or not package_id:
-                    continue
-            
-                # Get location types
-                location_types_str = str(row.get('service_location_types', 'AT_PIN'))
-                service_location_types = []
-                if pd.notna(location_types_str) and location_types_str != 'nan':
-                    service_location_types = [loc.strip() for loc in location_types_str.split(',')]
-                if not service_location_types:
-                    service_location_types = ['AT_PIN']
-                
-                current_package = {
-                    "id": package_id,
-                    "note": {
-                        "placeholder": str(row.get('other text field - placeholder', 'ระบุข้อมูลเพิ่มเติม'))
-                    },
-                    "image": {
-                        "cover": "https://example.com/inspection-cover.jpg",
-                        "thumbnail": "https://example.com/inspection-thumb.jpg"
-                    },
-                    "title": create_inline_text(package_name, package_name),
-                    "quantity": {
-                        "validation": {
-                            "max": int(row.get('max', 10)) if pd.notna(row.get('max')) else 10,
-                            "min": int(row.get('min', 1)) if pd.notna(row.get('min')) else 1
-                        },
-                        "placeholder": create_inline_text(
-                            str(row.get('quantity.placeholder', 'จำนวน')),
-                            "Quantity"
-                        )
-                    },
-                    "base_price": int(row.get('Starting price', 0)) if pd.notna(row.get('Starting price')) else 0,
-                    "description": create_inline_text(
-                        str(row.get('Package Description', '')),
-                        str(row.get('Package Description', ''))
-                    ),
-                    "configurations": []
-                }
-            
-            # Process configuration (for both new package and additional config rows)
-            if current_package:
-                config_type = str(row.get('Configurations.type', 'NONE')).strip().upper()
-                
-                if config_type not in ['NONE', 'NAN', ''] and not pd.isna(row.get('Configurations.type')):
-                    config_text = row.get('Package Detail selection ( Configuration )')
-                    config_title_raw = row.get('Configurations.title')
-                    config_id = row.get('Configurations.id', f'config-{len(current_package["configurations"])+1:03d}')
-                    
-                    # Smart title detection
-                    if pd.notna(config_title_raw) and str(config_title_raw).lower() not in ['nan', '']:
-                        config_title = str(config_title_raw)
-                    elif pd.notna(config_text):
-                        # Try to get title from first line of config_text
-                        first_line = str(config_text).split('\n')[0].strip()
-                        # Remove price info if exists
-                        if ':' in first_line and any(c.isdigit() for c in first_line):
-                            config_title = first_line.split(':')[0].strip()
-                        else:
-                            config_title = first_line if len(first_line) < 50 else str(config_id) if pd.notna(config_id) else "ตัวเลือก"
-                    elif pd.notna(config_id):
-                        config_title = str(config_id)
-                    else:
-                        config_title = "ตัวเลือก"
-                    
-                    # Parse items if config_text exists
-                    items = []
-                    if pd.notna(config_text):
-                        items = parse_configuration_text(config_text)
-                    
-                    # Create config if:
-                    # 1. Has items (RADIO, CHECKBOX), OR
-                    # 2. Is DATE_TIME_RANGE (doesn't need items)
-                    if items or config_type == "DATE_TIME_RANGE":
-                        config = {
-                            "id": str(config_id) if pd.notna(config_id) else f'config-{len(current_package["configurations"])+1:03d}',
-                            "data": {
-                                "items": items
-                            },
-                            "type": config_type,
-                            "title": config_title,
-                            "validation": {
-                                "required": config_type == "RADIO"
-                            },
-                            "description": None,
-                            "default_value": None
-                        }
-                        current_package["configurations"].append(config)
-        
-        # Don't forget to add the last package
-        if current_package:
-            packages.append(current_package)
-        
-        # Build JSON for this category
-        category_json = {
-            "id": category_slug,
-            "title": create_inline_text(subcat_thai if subcat_thai else category_name, category_name),
-            "packages": packages,
-            "cart_limit": cart_limit,
-            "components": {
-                "banner": {
-                    "title": create_i18n_text("service_definition.components.banner.title"),
-                    "button": {
-                        "url": "https://www.fastwork.co/join",
-                        "text": create_i18n_text("service_definition.components.banner.button_text")
-                    },
-                    "subtitle": create_i18n_text("service_definition.components.banner.subtitle")
-                },
-                "info_badge": [
-                    {
-                        "icon": "refund_icon",
-                        "full_text": create_i18n_text("service_definition.components.info_badge.refund.full_text"),
-                        "more_content": None,
-                        "highlight_text": create_i18n_text("service_definition.components.info_badge.refund.highlight_text")
-                    },
-                    {
-                        "icon": "payment_icon",
-                        "full_text": create_i18n_text("service_definition.components.info_badge.payment.full_text"),
-                        "more_content": None,
-                        "highlight_text": create_i18n_text("service_definition.components.info_badge.payment.highlight_text")
-                    }
-                ],
-                "location_box": {
-                    "text": {
-                        "at_pin": {
-                            "description": None,
-                            "placeholder": create_inline_text(
-                                "คุณต้องการให้ช่างไปที่ไหน ?",
-                                "Address where the service is needed"
-                            )
-                        },
-                        "online": {
-                            "description": None,
-                            "placeholder": None
-                        },
-                        "at_store": {
-                            "description": None,
-                            "placeholder": create_inline_text(
-                                "เราจะช่วยหาร้านที่ว่าง ใกล้หมุดที่คุณปัก",
-                                "We'll help find available shops near your location"
-                            )
-                        }
-                    },
-                    "visible": True,
-                    "service_location_types": service_location_types,
-                    "default_service_location_type": service_location_types[0] if service_location_types else "AT_PIN"
-                },
-                "cashback_section": {
-                    "icon": "point_icon",
-                    "full_text": create_i18n_text("service_definition.components.cashback_section.full_text"),
-                    "highlight_text": create_i18n_text("service_definition.components.cashback_section.highlight_text")
-                },
-                "summary_info_badge": [
-                    {
-                        "icon": "check_icon",
-                        "full_text": create_i18n_text("service_definition.summary_info_badge.full_text"),
-                        "more_content": None,
-                        "highlight_text": create_i18n_text("service_definition.summary_info_badge.highlight_text")
-                    }
-                ],
-                "summary_location_box": {
-                    "location": {
-                        "text": {
-                            "at_pin": {
-                                "description": None,
-                                "placeholder": create_inline_text(
-                                    "คุณต้องการให้ช่างไปที่ไหน ?",
-                                    "Address where the service is needed"
-                                )
-                            },
-                            "online": {
-                                "description": None,
-                                "placeholder": None
-                            },
-                            "at_store": {
-                                "description": None,
-                                "placeholder": create_inline_text(
-                                    "เราจะช่วยหาร้านที่ว่าง ใกล้หมุดที่คุณปัก",
-                                    "We'll help find available shops near your location"
-                                )
-                            }
-                        },
-                        "visible": True,
-                        "service_location_types": service_location_types,
-                        "default_service_location_type": service_location_types[0] if service_location_types else "AT_PIN"
-                    },
-                    "date_time": {
-                        "visible": True,
-                        "placeholder": create_inline_text(
-                            "เลือกวันที่และเวลารับบริการ",
-                            "Select date and time for service"
-                        )
-                    }
-                }
-            },
-            "cover_image": "https://example.com/service-cover.jpg",
-            "service_location_types": service_location_types
-        }
-        
-        results[category_slug] = {
-            'json': category_json,
-            'category_name': category_name,
-            'subcat_thai': subcat_thai,
-            'packages_count': len(packages)
-        }
-    
-    return results
-
 # Step 1: Upload Excel
 st.markdown("## 📤 Step 1: Upload Excel File")
 
@@ -379,35 +94,150 @@ uploaded_file = st.file_uploader(
     help="อัปโหลดไฟล์ Excel หรือ CSV ที่มีโครงสร้างแบบ Mint test form"
 )
 
+# Per-session result store: compact bytes, older uploads evicted beyond the budget
+SESSION_MEMORY_BUDGET = 32 * 1024 * 1024
+if 'result_store' not in st.session_state:
+    st.session_state['result_store'] = CompactResultStore(SESSION_MEMORY_BUDGET)
+result_store = st.session_state['result_store']
+
+SEARCH_RESULT_LIMIT = 50
+SEARCH_FIELD_LABELS = {
+    'package': 'ชื่อ package',
+    'package_id': 'Package Id',
+    'description': 'รายละเอียด',
+    'configuration': 'หัวข้อตัวเลือก',
+    'item': 'ตัวเลือก'
+}
+
 if uploaded_file is not None:
     try:
         # Read file (Excel or CSV)
-        file_extension = uploaded_file.name.split('.')[-1].lower()
-        if file_extension == 'csv':
-            df = pd.read_csv(uploaded_file)
-        else:
-            df = pd.read_excel(uploaded_file)
+        df = read_mint_file(uploaded_file, uploaded_file.name)
+        upload_key = f"{uploaded_file.name}:{hashlib.sha1(uploaded_file.getvalue()).hexdigest()[:12]}"
         
-        st.success(f"✅ อ่านไฟล์สำเร็จ! ({df.shape[0]} แถว, {df.shape[1]} คอลัมน์)")
+        st.success(f"✅ อ่านไฟล์สำเร็จ! ({df.shape[0]} แถว, {df.shape[1]} คอลัมน์, engine: {df.attrs.get('reader_engine')})")
         
         # Step 2: Convert
         st.markdown("## 🔄 Step 2: แปลงเป็น JSON")
         
+        lazy_mode = st.checkbox(
+            "⚡ แปลงเฉพาะ category ที่เลือก",
+            value=True,
+            help="สร้างรายการ category ทันที แล้วแปลง packages ของแต่ละ category เมื่อถูกเลือกหรือดาวน์โหลด (ผลลัพธ์เหมือนกัน)"
+        )
+        
+        # A conversion stopped with ⏹️ (or by any rerun) keeps the categories it finished
+        interrupted = st.session_state.pop('partial_conversion', None)
+        if interrupted and interrupted['upload_key'] == upload_key and interrupted['results']:
+            result_store.add(upload_key, dict(interrupted['results']), interrupted['source_map'])
+            st.warning(
+                f"⏹️ หยุดการแปลงแล้ว — เก็บ {len(interrupted['results'])}/{interrupted['categories_total']} "
+                f"categories ที่แปลงเสร็จ"
+            )
+        
         if st.button("🚀 เริ่มแปลง", type="primary"):
-            with st.spinner("กำลังแปลง..."):
-                results = split_by_category(df)
-            
-            if results:
-                st.session_state['results'] = results
-                st.success(f"✅ แปลงสำเร็จ! พบ {len(results)} categories")
+            if lazy_mode:
+                # Index only; the store converts each category on first load
+                lazy_results = LazyCategoryResults(df, source_map=True)
+                if len(lazy_results):
+                    result_store.add_lazy(upload_key, lazy_results)
+                    st.success(f"✅ แปลงสำเร็จ! พบ {len(lazy_results)} categories")
+                    st.caption(
+                        f"📊 {len(lazy_results.df_data):,} แถว → "
+                        f"{sum(data['packages_count'] for data in lazy_results.index.values()):,} packages "
+                        f"(แปลงเมื่อเลือก category)"
+                    )
+                else:
+                    st.error("❌ ไม่พบข้อมูล categories")
             else:
-                st.error("❌ ไม่พบข้อมูล categories")
+                # Category by category: live progress and partial results. ⏹️ only triggers a rerun,
+                # which stops this run; the next run keeps the finished categories (see above)
+                partial = {'upload_key': upload_key, 'results': {}, 'source_map': None, 'categories_total': 0}
+                st.session_state['partial_conversion'] = partial
+                progress_bar = st.progress(0.0, text="กำลังแปลง...")
+                st.button("⏹️ หยุดแปลง")
+                partial_slot = st.empty()
+                last_redraw = None
+                try:
+                    for step in iter_split_by_category(df, source_map=True):
+                        partial['results'][step['slug']] = step['result']
+                        partial['source_map'] = step['source_map']
+                        partial['categories_total'] = step['categories_total']
+                        # Redraw a few times per second rather than once per category
+                        finished = step['categories_done'] == step['categories_total']
+                        if finished or last_redraw is None or step['elapsed'] - last_redraw >= 0.25:
+                            last_redraw = step['elapsed']
+                            progress_bar.progress(
+                                step['categories_done'] / step['categories_total'],
+                                text=f"{step['categories_done']}/{step['categories_total']} categories · "
+                                     f"{step['rows_done']:,}/{step['rows_total']:,} แถว · {step['elapsed']:.1f}s"
+                            )
+                            partial_slot.dataframe(
+                                [
+                                    {
+                                        "Category": result['subcat_thai'],
+                                        "Packages": result['packages_count'],
+                                        "Schema errors": len(result['schema_errors'])
+                                    }
+                                    for result in partial['results'].values()
+                                ],
+                                use_container_width=True,
+                                hide_index=True
+                            )
+                except Exception:
+                    # A conversion error is not a ⏹️ stop: don't offer its partial results next run.
+                    # (Streamlit's rerun/stop interrupts are BaseException and keep them.)
+                    st.session_state.pop('partial_conversion', None)
+                    raise
+                st.session_state.pop('partial_conversion', None)
+                results = partial['results']
+                
+                if results:
+                    result_store.add(upload_key, results, partial['source_map'])
+                    stats = category_results_stats(results, len(df) - 1)
+                    # Full nested dicts are not kept; the store holds compressed bytes
+                    del results, partial
+                    st.success(f"✅ แปลงสำเร็จ! พบ {stats['categories']} categories")
+                    st.caption(
+                        f"📊 {stats['rows']:,} แถว → {stats['packages']:,} packages, "
+                        f"{stats['configurations']:,} configurations, {stats['items']:,} options"
+                    )
+                    if stats['schema_errors']:
+                        st.warning(f"⚠️ JSON ไม่ตรง schema {stats['schema_errors']:,} จุด (ดูรายละเอียดใน category ที่เลือก)")
+                else:
+                    st.error("❌ ไม่พบข้อมูล categories")
         
         # Step 3: Show Results
-        if 'results' in st.session_state:
-            results = st.session_state['results']
+        if upload_key in result_store:
+            result_store.touch(upload_key)
+            results = result_store.index(upload_key)
             
             st.markdown("## 📊 Step 3: เลือก Category")
+            st.caption(
+                f"💾 หน่วยความจำ session: {result_store.nbytes / 1024:,.1f} KB "
+                f"/ {result_store.budget_bytes / 1024 / 1024:,.0f} MB "
+                f"({len(result_store.uploads)} ไฟล์, ไฟล์นี้ {result_store.upload_nbytes(upload_key) / 1024:,.1f} KB, "
+                f"แปลงแล้ว {sum(data['converted'] for data in results.values())}/{len(results)} categories)"
+            )
+            
+            # Whole upload as one indexed SQLite file (built on demand; lazy uploads convert everything)
+            if st.button("🗄️ สร้างไฟล์ SQLite (ทุก category)",
+                         help="ตาราง categories / packages / configurations / items พร้อม index สำหรับ query ราคาและตัวเลือก"):
+                started = time.perf_counter()
+                sqlite_bytes, sqlite_counts = catalog_sqlite_bytes(
+                    result_store.load(upload_key, slug) for slug in results
+                )
+                st.caption(
+                    f"🗄️ {sqlite_counts['packages']:,} packages, {sqlite_counts['configurations']:,} configurations, "
+                    f"{sqlite_counts['items']:,} options → {len(sqlite_bytes) / 1024:,.1f} KB "
+                    f"({(time.perf_counter() - started) * 1000:.0f} ms)"
+                )
+                st.download_button(
+                    label="📥 ดาวน์โหลด SQLite",
+                    data=sqlite_bytes,
+                    file_name="service_definitions.sqlite",
+                    mime="application/vnd.sqlite3"
+                )
             
             # Category selector
             category_options = {
@@ -415,15 +245,49 @@ if uploaded_file is not None:
                 for slug, data in results.items()
             }
             
+            # Search across every category (jumps the selector to the best hit's category)
+            search_query = st.text_input(
+                "🔎 ค้นหา package / ตัวเลือก",
+                placeholder="เช่น ล้างแอร์, 2 ชั่วโมง, package id",
+                help="ค้นหาจากชื่อ package, id, รายละเอียด, หัวข้อ configuration และตัวเลือก ทุก category"
+            )
+            default_index = 0
+            if search_query:
+                # Lazy uploads convert their remaining categories when the index is first built
+                search_index = result_store.search_index(upload_key)
+                started = time.perf_counter()
+                search_hits = search_index.search(search_query, limit=SEARCH_RESULT_LIMIT)
+                search_ms = (time.perf_counter() - started) * 1000
+                if search_hits:
+                    st.caption(f"พบ {len(search_hits)} รายการ ({search_ms:.1f} ms)")
+                    st.dataframe(
+                        [
+                            {
+                                "Category": results[hit['slug']]['subcat_thai'],
+                                "Package": hit['package_title'],
+                                "พบใน": SEARCH_FIELD_LABELS[hit['field']],
+                                "ข้อความ": hit['text'],
+                            }
+                            for hit in search_hits
+                        ],
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    default_index = list(category_options).index(search_hits[0]['slug'])
+                else:
+                    st.caption(f"ไม่พบ \"{search_query}\"")
+            
             selected_slug = st.selectbox(
                 "เลือก Category:",
                 options=list(category_options.keys()),
+                index=default_index,
                 format_func=lambda x: category_options[x]
             )
             
             if selected_slug:
                 category_data = results[selected_slug]
-                category_json = category_data['json']
+                # Decode only the selected category
+                category_json = result_store.load(upload_key, selected_slug)
                 
                 # Show stats
                 col1, col2, col3, col4 = st.columns(4)
@@ -438,13 +302,60 @@ if uploaded_file is not None:
                 with col3:
                     st.metric("Cart Limit", category_json['cart_limit'])
                 with col4:
-                    json_size = len(json.dumps(category_json))
-                    st.metric("JSON Size", f"{json_size:,} bytes")
+                    # Filled in below from the same bytes that get downloaded
+                    json_size_slot = st.empty()
+                
+                # Validated against the service definition schema right after conversion
+                schema_errors = result_store.schema_errors(upload_key, selected_slug)
+                source_map = result_store.source_map(upload_key, selected_slug)
+                if schema_errors:
+                    st.warning(f"⚠️ JSON ไม่ตรง schema {len(schema_errors)} จุด")
+                    with st.expander("ดูรายละเอียด schema errors"):
+                        st.dataframe(
+                            [
+                                {
+                                    **error,
+                                    "Excel": (source_map.locate(selected_slug, error['path']) or {}).get('cell')
+                                    if source_map is not None else None
+                                }
+                                for error in schema_errors
+                            ],
+                            use_container_width=True,
+                            hide_index=True
+                        )
+                else:
+                    st.caption("✅ JSON ตรงตาม schema ของ Service Definition")
+                
+                # Optional: shared configurations emitted once under "definitions"
+                dedup_configs = st.checkbox(
+                    "♻️ รวม configurations ที่ซ้ำกัน ($ref)",
+                    help="configuration ที่เหมือนกันหลาย package จะถูกเขียนครั้งเดียวใน definitions แล้วอ้างอิงด้วย $ref"
+                )
+                # Serialize once per variant and keep the bytes in the store across reruns;
+                # every size below comes from these bytes.
+                # json.dumps escapes \r inside strings, so the output is LF-only.
+                encoded, dedup_stats = result_store.encoded(upload_key, selected_slug, dedup_configs)
+                if dedup_configs:
+                    if dedup_stats['shared_configurations']:
+                        st.caption(
+                            f"♻️ รวม {dedup_stats['shared_configurations']} configurations "
+                            f"({dedup_stats['references']} references) → ลดขนาด {dedup_stats['bytes_saved']:,} bytes "
+                            f"({dedup_stats['bytes_before']:,} → {dedup_stats['bytes_after']:,})"
+                        )
+                    else:
+                        st.caption("ไม่มี configuration ซ้ำใน category นี้")
                 
-                # Generate JSON with proper line endings (LF only)
-                json_str = json.dumps(category_json, ensure_ascii=False, indent=2)
-                # Ensure LF line endings (Unix style)
-                json_str = json_str.replace('\r\n', '\n').replace('\r', '\n')
+                minify_output = st.checkbox(
+                    "🗜️ Minified JSON (ไม่มี indent)",
+                    help="สำหรับส่งขึ้น CDN: ขนาดเล็กที่สุด พร้อมไฟล์ .gz ที่บีบอัดไว้แล้ว"
+                )
+                
+                json_bytes = encoded['minified'] if minify_output else encoded['pretty']
+                json_str = json_bytes.decode('utf-8')
+                json_size_slot.metric("JSON Size", f"{len(json_bytes):,} bytes")
+                st.caption("📏 " + " · ".join(
+                    f"{name} {size:,}" for name, size in encoded['sizes'].items()
+                ) + " bytes")
                 
                 # Action buttons
                 st.markdown("### 🎯 Actions")
@@ -454,12 +365,22 @@ if uploaded_file is not None:
                 with col1:
                     st.download_button(
                         label="📥 ดาวน์โหลด JSON (แนะนำ)",
-                        data=json_str.encode('utf-8'),
+                        data=json_bytes,
                         file_name=f"{selected_slug}.json",
                         mime="application/json",
                         use_container_width=True,
                         help="ใช้วิธีนี้เพื่อหลีกเลี่ยงปัญหา line endings ใน IDE"
                     )
+                    # Pre-compressed (minified) variants for the CDN
+                    for suffix, payload in encoded['compressed'].items():
+                        st.download_button(
+                            label=f"🗜️ ดาวน์โหลด .json{suffix} ({len(payload):,} bytes)",
+                            data=payload,
+                            file_name=f"{selected_slug}.json{suffix}",
+                            mime="application/octet-stream",
+                            use_container_width=True,
+                            key=f"download_{selected_slug}{suffix}"
+                        )
                 
                 with col2:
                     show_json = st.checkbox("👁️ แสดง JSON Code เพื่อ Copy", help="แสดง JSON ในรูปแบบ text area สำหรับ copy")
@@ -486,6 +407,81 @@ if uploaded_file is not None:
                     st.warning("⚠️ **หมายเหตุ:** หากต้องการ copy JSON กรุณาใช้ปุ่ม '👁️ แสดง JSON Code เพื่อ Copy' ด้านบน เพื่อหลีกเลี่ยงปัญหา line endings")
                     st.code(json_str, language='json', line_numbers=True)
                 
+                # Price ranges per package (min/max/distribution without enumerating combinations)
+                st.markdown("### 💰 ช่วงราคาและชุดตัวเลือก")
+                top_n = st.number_input(
+                    "จำนวนชุดตัวเลือกที่แพงที่สุดต่อ package",
+                    min_value=0, max_value=20, value=3,
+                    help="คำนวณจาก RADIO (เลือก 1) และ CHECKBOX (เลือกได้หลายอย่าง) + additional_price"
+                )
+                # One summary per package, in package order (ids are not unique in real sheets)
+                price_report = category_price_report(category_json, top_n=int(top_n))
+                st.dataframe(
+                    [
+                        {
+                            "Package": summary['title'],
+                            "ราคาเริ่มต้น": summary['base_price'],
+                            "ต่ำสุด": summary['min_price'],
+                            "สูงสุด": summary['max_price'],
+                            "ชุดตัวเลือก": f"{summary['combinations']:,}",
+                            "มัธยฐาน": summary['median_price'],
+                            "P10–P90": f"{summary['p10_price']:,}–{summary['p90_price']:,}",
+                        }
+                        for summary in price_report
+                    ],
+                    use_container_width=True,
+                    hide_index=True
+                )
+                if top_n:
+                    with st.expander(f"🏷️ {int(top_n)} ชุดตัวเลือกที่แพงที่สุดของแต่ละ package"):
+                        for summary in price_report:
+                            st.markdown(f"**{summary['title']}**")
+                            for combo in summary['top_combinations']:
+                                choices = '; '.join(
+                                    f"{title}: {', '.join(values)}" for title, values in combo['selections'].items()
+                                ) or 'ไม่เลือกตัวเลือกเพิ่ม'
+                                st.caption(f"฿{combo['price']:,} — {choices}")
+                st.download_button(
+                    label="📥 ดาวน์โหลดรายงานราคา (CSV)",
+                    data=price_report_csv(category_json, top_n=int(top_n)),
+                    file_name=f"{selected_slug}_prices.csv",
+                    mime="text/csv",
+                    key=f"price_report_{selected_slug}"
+                )
+                
+                # Source map: package → its rows in the uploaded sheet, sheet row → JSON path
+                if source_map is not None and category_json['packages']:
+                    st.markdown("### 📍 ที่มาใน Excel")
+                    source_packages = category_json['packages']
+                    source_package = st.selectbox(
+                        "Package:",
+                        options=list(range(len(source_packages))),
+                        format_func=lambda i: f"{source_packages[i]['title']['values']['th']} ({source_packages[i]['id']})",
+                        key=f"source_package_{selected_slug}"
+                    )
+                    positions = source_map.package_positions(selected_slug, source_package)
+                    if positions:
+                        sheet_rows = [source_map.sheet_rows[position] for position in positions]
+                        package_cell = source_map.locate(selected_slug, f"/packages/{source_package}")
+                        st.caption(
+                            f"แถว {sheet_rows[0]}–{sheet_rows[-1]} (Package Name อยู่ที่ช่อง {package_cell['cell']}) "
+                            f"→ /packages/{source_package}"
+                        )
+                        source_rows = prepare_mint_frame(df).iloc[list(positions)]
+                        source_rows.index = sheet_rows
+                        st.dataframe(source_rows.dropna(axis=1, how='all'), use_container_width=True)
+                    sheet_row = st.number_input(
+                        "แถวใน Excel → JSON path",
+                        min_value=0, value=0, step=1,
+                        help="ใส่เลขแถวของ sheet เพื่อดูว่าแถวนั้นกลายเป็น package / configuration ไหนใน JSON"
+                    )
+                    if sheet_row:
+                        row_source = source_map.locate_row(int(sheet_row))
+                        if row_source:
+                            st.caption(f"แถว {int(sheet_row)} → {row_source['slug']}: {row_source['path']}")
+                        else:
+                            st.caption(f"แถว {int(sheet_row)} ไม่ได้สร้าง package หรือ configuration (หรือ category ยังไม่ถูกแปลง)")
+                
                 # Preview packages - Mobile Mockup
                 st.markdown("### 📱 Preview Packages (Mobile Demo)")
                 
@@ -504,9 +500,11 @@ if uploaded_file is not None:
                     for idx, pkg in enumerate(demo_packages):
                         # Package Card
                         desc_short = pkg['description']['values']['th'][:80] + ('...' if len(pkg['description']['values']['th']) > 80 else '')
+                        summary = price_report[idx]
+                        price_range_html = f'<div style="color: #667eea; font-size: 12px; margin: -4px 0 6px 0;">ช่วงราคา ฿{summary["min_price"]:,} – ฿{summary["max_price"]:,}</div>' if summary['min_price'] != summary['max_price'] else ''
                         note_placeholder = pkg.get('note', {}).get('placeholder', '')
                         note_html = f'<div style="background: #fff3e0; border-left: 3px solid #ff9800; padding: 6px 10px; margin: 6px 0 10px 0; border-radius: 4px; font-size: 11px;"><span style="color: #e65100;">💬</span> <span style="color: #757575; font-style: italic;">{note_placeholder}</span></div>' if note_placeholder else ''
-                        mobile_html += f'<div style="background: white; border-radius: 12px; padding: 16px; margin: 12px 0; box-shadow: 0 2px 8px rgba(0,0,0,0.06);"><div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;"><div style="font-weight: 600; color: #1a1a1a; font-size: 15px;">{pkg["title"]["values"]["th"]}</div><div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 6px 12px; border-radius: 8px; font-weight: bold; font-size: 14px;">฿{pkg["base_price"]:,}</div></div>{note_html}<p style="color: #666; margin: 6px 0; line-height: 1.4; font-size: 13px;">{desc_short}</p><div style="background: #f8f9fa; padding: 8px; border-radius: 6px; margin-top: 8px; font-size: 12px;"><span style="color: #666;">📦 {pkg["quantity"]["validation"]["min"]}-{pkg["quantity"]["validation"]["max"]} {pkg["quantity"]["placeholder"]["values"]["th"]}</span></div></div>'
+                        mobile_html += f'<div style="background: white; border-radius: 12px; padding: 16px; margin: 12px 0; box-shadow: 0 2px 8px rgba(0,0,0,0.06);"><div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;"><div style="font-weight: 600; color: #1a1a1a; font-size: 15px;">{pkg["title"]["values"]["th"]}</div><div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 6px 12px; border-radius: 8px; font-weight: bold; font-size: 14px;">฿{pkg["base_price"]:,}</div></div>{price_range_html}{note_html}<p style="color: #666; margin: 6px 0; line-height: 1.4; font-size: 13px;">{desc_short}</p><div style="background: #f8f9fa; padding: 8px; border-radius: 6px; margin-top: 8px; font-size: 12px;"><span style="color: #666;">📦 {pkg["quantity"]["validation"]["min"]}-{pkg["quantity"]["validation"]["max"]} {pkg["quantity"]["placeholder"]["values"]["th"]}</span></div></div>'
                         
                         # Configurations
                         if pkg['configurations']:
@@ -6,9 +6,50 @@ Updated: 2026-01-15 17:30
 
 import streamlit as st
 import pandas as pd
+import numpy as np
+import csv
+import gzip
+import heapq
+import importlib.util
+import io
 import json
+import math
+import multiprocessing
+import os
 import re
-from typing import Dict, List, Any, Optional
+import sqlite3
+import sys
+import tempfile
+import time
+import unicodedata
+import zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: extra .br output
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: extra .zst output
+    zstandard = None
+
+# Header row of the Mint form (same order as "Mint test form.xlsx")
+MINT_HEADERS = [
+    'Category', 'Subcat thai', 'Category slug', 'Cart limit',
+    'Package Name', 'Package Id', 'Package Description',
+    'Starting price', 'min', 'max', 'quantity.placeholder',
+    'Configurations.title', 'Package Detail selection ( Configuration )',
+    'Configurations.id', 'Configurations.type',
+    'other text field - placeholder', 'service_location_types',
+    'Location type', 'marketplace subcategory'
+]
 
 def create_inline_text(th: str, en: str = "") -> Dict:
     """Create INLINE text structure"""
@@ -78,179 +119,558 @@ def parse_configuration_text(config_text: str) -> List[Dict]:
     
     return items
 
-def convert_mint_excel_to_json(df: pd.DataFrame, service_id: str = None, 
-                                service_title_th: str = None,
-                                service_title_en: str = None) -> Dict:
+def parse_configuration_column(config_texts: pd.Series) -> pd.Series:
     """
-    Convert Mint Excel format to JSON structure
-    
-    Excel columns (from row 0):
-    - Category, Subcat thai, Category slug, Cart limit
-    - Package Name, Package Id, Package Description
-    - Starting price, min, max, quantity.placeholder
-    - Configurations.title, Package Detail selection ( Configuration ), Configurations.id, Configurations.type
-    - Configurations.title.2, Package Detail selection ( Configuration ).2, Configurations.id.2, Configurations.type.2
-    - Configurations.title.3, Package Detail selection ( Configuration ).3, Configurations.id.3, Configurations.type.3
-    - (Support up to 5 configurations per package)
-    - other text field - placeholder
-    - service_location_types, Location type, marketplace subcategory
-    
-    Configuration Types:
-    - NONE = no configuration (configurations: [])
-    - RADIO = radio buttons (single select)
-    - CHECKBOX = checkboxes (multiple select)
-    - DATE_TIME_RANGE = date/time range picker
+    parse_configuration_text for a whole 'Package Detail selection ( Configuration )'
+    column. Sheets repeat the same option block across many packages, so each
+    distinct cell text is parsed once; every cell still gets its own item dicts.
+    Returns a Series (same index) of item lists identical to the per-cell results.
     """
+    parsed: Dict[Any, List[Dict]] = {}
+    item_lists = []
+    for text in config_texts.tolist():
+        items = parsed.get(text)
+        if items is None:
+            items = parsed[text] = parse_configuration_text(text)
+            item_lists.append(items)
+        else:
+            item_lists.append([dict(item) for item in items])
+    return pd.Series(item_lists, index=config_texts.index, dtype=object)
+
+class ConfigurationInterner:
+    """
+    Share one object per distinct configuration (and per distinct item list),
+    so packages repeating the same option block don't each hold a copy.
+    """
+
+    def __init__(self):
+        self.configurations: Dict[str, Dict] = {}
+        self.item_lists: Dict[str, List[Dict]] = {}
+
+    @staticmethod
+    def key(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+    def intern(self, config: Dict) -> Dict:
+        items = config["data"]["items"]
+        config["data"]["items"] = self.item_lists.setdefault(self.key(items), items)
+        return self.configurations.setdefault(self.key(config), config)
+
+CONFIGURATION_REF_PREFIX = "#/definitions/configurations/"
+
+def dump_json_bytes(data: Dict, minify: bool = False) -> bytes:
+    """Serialize the way the app downloads JSON (indent=2, UTF-8), or minified"""
+    if minify:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+# File suffix → name used in size reports; brotli / zstd only when installed
+COMPRESSION_NAMES = {'.gz': 'gzip', '.br': 'brotli', '.zst': 'zstd'}
+
+def precompress_json(payload: bytes) -> Dict[str, bytes]:
+    """Pre-compressed variants of a JSON payload, keyed by file suffix"""
+    variants = {'.gz': gzip.compress(payload, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(payload, quality=11)
+    if zstandard is not None:
+        variants['.zst'] = zstandard.ZstdCompressor(level=19).compress(payload)
+    return variants
+
+def encode_category_json(category_json: Dict, pretty: bool = True, precompress: bool = True) -> Dict:
+    """
+    Serialize a category once per output variant and report sizes from those bytes:
+    pretty (indent=2, for display/download), minified, and compressed variants of
+    the minified payload.
+    """
+    encoded = {'minified': dump_json_bytes(category_json, minify=True)}
+    if pretty:
+        encoded['pretty'] = dump_json_bytes(category_json)
+    encoded['compressed'] = precompress_json(encoded['minified']) if precompress else {}
+
+    sizes = {'pretty': len(encoded['pretty'])} if pretty else {}
+    sizes['minified'] = len(encoded['minified'])
+    for suffix, payload in encoded['compressed'].items():
+        sizes[COMPRESSION_NAMES[suffix]] = len(payload)
+    encoded['sizes'] = sizes
+    return encoded
+
+def deduplicate_configurations(category_json: Dict) -> Tuple[Dict, Dict]:
+    """
+    Opt-in output mode: configurations used by 2+ packages are emitted once under
+    "definitions.configurations" and packages point at them with {"$ref": ...}.
     
-    # Set headers from first row
-    headers = df.iloc[0].tolist()
-    df_data = df.iloc[1:].copy()
-    df_data.columns = headers
-    
-    # Clean up column names
-    df_data.columns = df_data.columns.str.strip()
-    
-    # Get service metadata from first package
-    first_package = df_data[df_data['Package Name'].notna()].iloc[0]
-    cart_limit = int(str(first_package.get('Cart limit', 10)).replace(',', '')) if pd.notna(first_package.get('Cart limit')) and str(first_package.get('Cart limit', 10)).replace(',', '').isdigit() else 10
-    category = first_package.get('Category', 'Service')
-    subcat_thai = first_package.get('Subcat thai', '')
-    
-    # Use provided service details or generate from data
-    if not service_id:
-        service_id = str(first_package.get('Category slug', 'service-001')).strip()
-    if not service_title_th:
-        service_title_th = subcat_thai if subcat_thai else category
-    if not service_title_en:
-        service_title_en = category
-    
-    # Build packages
+    Returns (deduplicated JSON, stats with bytes saved for this category).
+    """
+    counts: Dict[str, int] = {}
+    for pkg in category_json['packages']:
+        for config in pkg['configurations']:
+            key = ConfigurationInterner.key(config)
+            counts[key] = counts.get(key, 0) + 1
+
+    names: Dict[str, str] = {}
+    definitions: Dict[str, Dict] = {}
     packages = []
-    current_package = None
-    
-    for idx, row in df_data.iterrows():
-        # Check if this is a new package (has Package Name)
-        has_package_name = pd.notna(row.get('Package Name')) and str(row.get('Package Name')).strip()
-        
-        if has_package_name:
-            # Save previous package if exists
-            if current_package:
-                packages.append(current_package)
-            
-            # Start new package
-            package_name = str(row['Package Name']).strip()
-            package_id = str(row['Package Id']).strip()
-            
-            if not package_name or not package_id:
+    references = 0
+    for pkg in category_json['packages']:
+        configurations = []
+        for config in pkg['configurations']:
+            key = ConfigurationInterner.key(config)
+            if counts[key] < 2:
+                configurations.append(config)
                 continue
-        
-            # Get service location types
-            location_types_str = str(row.get('service_location_types', 'AT_PIN'))
-            service_location_types = []
-            if pd.notna(location_types_str) and location_types_str != 'nan':
-                service_location_types = [loc.strip() for loc in location_types_str.split(',')]
-            if not service_location_types:
-                service_location_types = ['AT_PIN']
-            
-            current_package = {
-                "id": package_id,
-                "note": {
-                    "placeholder": str(row.get('other text field - placeholder', 'ระบุข้อมูลเพิ่มเติม'))
-                },
-                "image": {
-                    "cover": "https://example.com/inspection-cover.jpg",
-                    "thumbnail": "https://example.com/inspection-thumb.jpg"
+            if key not in names:
+                name = str(config['id'])
+                suffix = 2
+                while name in definitions:
+                    name = f"{config['id']}-{suffix}"
+                    suffix += 1
+                names[key] = name
+                definitions[name] = config
+            configurations.append({"$ref": CONFIGURATION_REF_PREFIX + names[key]})
+            references += 1
+        packages.append({**pkg, "configurations": configurations})
+
+    deduped = {**category_json, "packages": packages}
+    if definitions:
+        deduped["definitions"] = {"configurations": definitions}
+
+    bytes_before = len(dump_json_bytes(category_json))
+    bytes_after = len(dump_json_bytes(deduped)) if definitions else bytes_before
+    stats = {
+        "shared_configurations": len(definitions),
+        "references": references,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_saved": bytes_before - bytes_after
+    }
+    return deduped, stats
+
+def resolve_configuration_refs(category_json: Dict) -> Dict:
+    """
+    Inverse of deduplicate_configurations: inline every {"$ref": ...} configuration.
+    Malformed input (wrong types, unknown refs) is left as is for schema validation to report.
+    """
+    definitions = category_json.get("definitions")
+    definitions = definitions.get("configurations") if isinstance(definitions, dict) else None
+    if not definitions or not isinstance(definitions, dict) or not isinstance(category_json.get("packages"), list):
+        return category_json
+
+    def resolve(config):
+        ref = config.get("$ref") if isinstance(config, dict) else None
+        if not isinstance(ref, str) or not ref.startswith(CONFIGURATION_REF_PREFIX):
+            return config
+        return definitions.get(ref[len(CONFIGURATION_REF_PREFIX):], config)
+
+    resolved = {key: value for key, value in category_json.items() if key != "definitions"}
+    resolved["packages"] = [
+        {**pkg, "configurations": [resolve(config) for config in pkg['configurations']]}
+        if isinstance(pkg, dict) and isinstance(pkg.get('configurations'), list) else pkg
+        for pkg in category_json['packages']
+    ]
+    return resolved
+
+# Output shape expected by the consuming service (JSON Schema subset, see compile_schema)
+LOCATION_TYPES = ["AT_PIN", "AT_STORE", "ONLINE"]
+SERVICE_DEFINITION_SCHEMA = {
+    "definitions": {
+        "inline_text": {
+            "type": "object",
+            "required": ["kind", "values"],
+            "properties": {
+                "kind": {"const": "INLINE"},
+                "values": {
+                    "type": "object",
+                    "required": ["en", "th"],
+                    "properties": {"en": {"type": "string"}, "th": {"type": "string"}}
+                }
+            }
+        },
+        "i18n_text": {
+            "type": "object",
+            "required": ["key", "kind"],
+            "properties": {"key": {"type": "string", "minLength": 1}, "kind": {"const": "I18N"}}
+        },
+        "item": {
+            "type": "object",
+            "required": ["id", "value", "additional_price"],
+            "properties": {
+                "id": {"type": "string"},
+                "value": {"type": "string", "minLength": 1},
+                "additional_price": {"type": "integer"}
+            }
+        },
+        "configuration": {
+            "type": "object",
+            "required": ["id", "data", "type", "title", "validation"],
+            "properties": {
+                "id": {"type": "string", "minLength": 1},
+                "type": {"enum": ["RADIO", "CHECKBOX", "DATE_TIME_RANGE"]},
+                "title": {"type": "string"},
+                "data": {
+                    "type": "object",
+                    "required": ["items"],
+                    "properties": {"items": {"type": "array", "items": {"$ref": "#/definitions/item"}}}
                 },
-                "title": create_inline_text(package_name, package_name),
-            "quantity": {
                 "validation": {
-                    "max": int(str(row.get('max', 10)).replace(',', '')) if pd.notna(row.get('max')) and str(row.get('max', 10)).replace(',', '').replace('.', '').isdigit() else 10,
-                    "min": int(str(row.get('min', 1)).replace(',', '')) if pd.notna(row.get('min')) and str(row.get('min', 1)).replace(',', '').replace('.', '').isdigit() else 1
-                },
-                    "placeholder": create_inline_text(
-                        str(row.get('quantity.placeholder', 'จำนวน')),
-                        "Quantity"
-                    )
+                    "type": "object",
+                    "required": ["required"],
+                    "properties": {"required": {"type": "boolean"}}
+                }
+            },
+            # Choice configurations need something to choose from
+            "if": {"properties": {"type": {"enum": ["RADIO", "CHECKBOX"]}}},
+            "then": {"properties": {"data": {"properties": {"items": {"minItems": 1}}}}}
+        },
+        "package": {
+            "type": "object",
+            "required": ["id", "title", "quantity", "base_price", "description", "configurations"],
+            "properties": {
+                "id": {"type": "string", "minLength": 1},
+                "title": {"$ref": "#/definitions/inline_text"},
+                "description": {"$ref": "#/definitions/inline_text"},
+                "note": {"type": "object", "properties": {"placeholder": {"type": "string"}}},
+                "base_price": {"type": "integer", "minimum": 0},
+                "quantity": {
+                    "type": "object",
+                    "required": ["validation", "placeholder"],
+                    "properties": {
+                        "validation": {
+                            "type": "object",
+                            "required": ["min", "max"],
+                            "properties": {
+                                "min": {"type": "integer", "minimum": 0},
+                                "max": {"type": "integer", "minimum": 1}
+                            }
+                        },
+                        "placeholder": {"$ref": "#/definitions/inline_text"}
+                    }
                 },
-                "base_price": int(str(row.get('Starting price', 0)).replace(',', '')) if pd.notna(row.get('Starting price')) and str(row.get('Starting price', 0)).replace(',', '').isdigit() else 0,
-                "description": create_inline_text(
-                    str(row.get('Package Description', '')),
-                    str(row.get('Package Description', ''))
-                ),
-                "configurations": []
+                "configurations": {"type": "array", "items": {"$ref": "#/definitions/configuration"}}
             }
-        
-        # Process configuration (for both new package and additional config rows)
-        if current_package:
-            config_type = str(row.get('Configurations.type', 'NONE')).strip().upper()
-            
-            # Skip if NONE or NAN or empty
-            if config_type not in ['NONE', 'NAN', ''] and not pd.isna(row.get('Configurations.type')):
-                config_text = row.get('Package Detail selection ( Configuration )')
-                config_title_raw = row.get('Configurations.title')
-                config_id = str(row.get('Configurations.id', f'config-{len(current_package["configurations"])+1:03d}')) if pd.notna(row.get('Configurations.id')) else f'config-{len(current_package["configurations"])+1:03d}'
-                
-                # Smart title detection
-                if pd.notna(config_title_raw) and str(config_title_raw).lower() not in ['nan', '']:
-                    config_title = str(config_title_raw)
-                elif pd.notna(config_text):
-                    # Try to get title from first line of config_text
-                    first_line = str(config_text).split('\n')[0].strip()
-                    # Remove price info if exists
-                    if ':' in first_line and any(c.isdigit() for c in first_line):
-                        config_title = first_line.split(':')[0].strip()
-                    else:
-                        config_title = first_line if len(first_line) < 50 else config_id
-                elif pd.notna(config_id):
-                    config_title = config_id
-                else:
-                    config_title = "ตัวเลือก"
-                
-                # Parse items from config_text
-                items = []
-                if pd.notna(config_text):
-                    items = parse_configuration_text(config_text)
-                
-                # Create config if:
-                # 1. Has items (RADIO, CHECKBOX), OR
-                # 2. Is DATE_TIME_RANGE (doesn't need items)
-                if items or config_type == "DATE_TIME_RANGE":
-                    config = {
-                        "id": config_id,
-                        "data": {
-                            "items": items
-                        },
-                        "type": config_type,
-                        "title": config_title,
-                        "validation": {
-                            "required": config_type == "RADIO"
+        }
+    },
+    "type": "object",
+    "required": ["id", "title", "packages", "cart_limit", "components", "service_location_types"],
+    "properties": {
+        "id": {"type": "string", "minLength": 1},
+        "title": {"$ref": "#/definitions/inline_text"},
+        "note": {"type": "object", "properties": {"placeholder": {"$ref": "#/definitions/i18n_text"}}},
+        "cart_limit": {"type": "integer", "minimum": 1},
+        "packages": {"type": "array", "items": {"$ref": "#/definitions/package"}},
+        "components": {
+            "type": "object",
+            "required": ["location_box"],
+            "properties": {
+                "location_box": {
+                    "type": "object",
+                    "required": ["service_location_types", "default_service_location_type"],
+                    "properties": {
+                        "visible": {"type": "boolean"},
+                        "service_location_types": {
+                            "type": "array", "minItems": 1, "items": {"enum": LOCATION_TYPES}
                         },
-                        "description": None,
-                        "default_value": None
+                        "default_service_location_type": {"enum": LOCATION_TYPES}
                     }
-                    
-                    current_package["configurations"].append(config)
-    
-    # Don't forget to add the last package
-    if current_package:
-        packages.append(current_package)
-    
-    # Get service location types from first package
-    first_pkg_location = packages[0] if packages else {}
-    location_types_str = str(df_data[df_data['Package Name'].notna()].iloc[0].get('service_location_types', 'AT_PIN'))
-    service_location_types = []
-    if pd.notna(location_types_str) and location_types_str != 'nan':
-        service_location_types = [loc.strip() for loc in location_types_str.split(',')]
-    if not service_location_types:
-        service_location_types = ['AT_PIN']
-    
-    # Build final JSON structure
-    result = {
-        "id": service_id,
+                }
+            }
+        },
+        "service_location_types": {"type": "array", "minItems": 1, "items": {"enum": LOCATION_TYPES}}
+    }
+}
+
+SCHEMA_TYPE_CHECKS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "integer": "(isinstance({v}, int) and not isinstance({v}, bool))",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+}
+
+class SchemaCompiler:
+    """
+    Turns a JSON Schema subset (type, const, enum, required, properties, items,
+    minimum, maximum, minLength, minItems, if/then, local $ref) into Python source
+    with one function per definition, then compiles it once. Errors are collected
+    as (JSON Pointer, message) without stopping at the first one.
+    """
+
+    def __init__(self, schema: Dict):
+        self.schema = schema
+        self.functions: Dict[str, str] = {}
+        self.names: Dict[str, str] = {}
+        self.counter = 0
+
+    def compile(self) -> Callable[[Any, str, list], None]:
+        root = self.function_for('#', self.schema)
+        self.source = '\n\n'.join(self.functions.values())
+        namespace: Dict[str, Any] = {}
+        exec(compile(self.source, '<service-definition-schema>', 'exec'), namespace)
+        return namespace[root]
+
+    def function_for(self, ref: str, schema: Dict) -> str:
+        if ref not in self.names:
+            name = 'validate_' + (re.sub(r'\W', '_', ref.rsplit('/', 1)[-1]) if ref != '#' else 'root')
+            self.names[ref] = name
+            body = self.emit(schema, 'data', 'path', 'errors', 1)
+            self.functions[name] = '\n'.join([f"def {name}(data, path, errors):"] + (body or ['    pass']))
+        return self.names[ref]
+
+    def resolve(self, ref: str) -> Dict:
+        node = self.schema
+        for part in ref.lstrip('#/').split('/'):
+            node = node[part]
+        return node
+
+    def variable(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def emit(self, schema: Dict, var: str, path: str, errors: str, depth: int) -> List[str]:
+        """Checking code for one value; paths are string expressions only evaluated on error"""
+        pad = '    ' * depth
+        if '$ref' in schema:
+            name = self.function_for(schema['$ref'], self.resolve(schema['$ref']))
+            return [f"{pad}{name}({var}, {path}, {errors})"]
+
+        def fail(message_expr: str, indent: str = pad) -> str:
+            return f"{indent}{errors}.append(({path}, {message_expr}))"
+
+        lines = []
+        if 'const' in schema:
+            lines += [f"{pad}if {var} != {schema['const']!r}:",
+                      fail(repr(f"expected {schema['const']!r}") + f" + ', got ' + repr({var})", pad + '    ')]
+        if 'enum' in schema:
+            lines += [f"{pad}if {var} not in {tuple(schema['enum'])!r}:",
+                      fail(repr(f"expected one of {schema['enum']}") + f" + ', got ' + repr({var})", pad + '    ')]
+
+        inner = self.emit_typed(schema, var, path, errors, depth + 1 if 'type' in schema else depth)
+        if 'type' in schema:
+            types = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+            condition = ' or '.join(SCHEMA_TYPE_CHECKS[t].format(v=var) for t in types)
+            lines += [f"{pad}if not ({condition}):",
+                      fail(repr(f"expected {'/'.join(types)}") + f" + ', got ' + type({var}).__name__", pad + '    ')]
+            if inner:
+                lines += [f"{pad}else:"] + inner
+        else:
+            lines += inner
+        return lines
+
+    def emit_typed(self, schema: Dict, var: str, path: str, errors: str, depth: int) -> List[str]:
+        """Keyword checks that assume the type check passed (each guarded by isinstance when untyped)"""
+        typed = 'type' in schema
+        pad = '    ' * (depth if typed else depth + 1)
+        blocks: List[Tuple[str, List[str]]] = []
+
+        def fail(message_expr: str) -> str:
+            return f"{pad}    {errors}.append(({path}, {message_expr}))"
+
+        for keyword, operator in (('minimum', '<'), ('maximum', '>')):
+            if keyword in schema:
+                blocks.append(('(int, float)', [
+                    f"{pad}if {var} {operator} {schema[keyword]!r}:",
+                    fail(f"'must be {'>=' if operator == '<' else '<='} {schema[keyword]}, got ' + repr({var})")
+                ]))
+        if 'minLength' in schema:
+            blocks.append(('str', [
+                f"{pad}if len({var}) < {schema['minLength']}:",
+                fail(repr(f"must have at least {schema['minLength']} character(s)"))
+            ]))
+        if 'minItems' in schema:
+            blocks.append(('list', [
+                f"{pad}if len({var}) < {schema['minItems']}:",
+                fail(repr(f"must have at least {schema['minItems']} item(s)"))
+            ]))
+        object_lines = []
+        for key in schema.get('required', []):
+            object_lines += [f"{pad}if {key!r} not in {var}:", fail(repr(f"missing required property '{key}'"))]
+        for key, subschema in schema.get('properties', {}).items():
+            value = self.variable('v')
+            body = self.emit(subschema, value, f"{path} + {'/' + key!r}", errors, len(pad) // 4 + 1)
+            if body:
+                object_lines += [f"{pad}if {key!r} in {var}:", f"{pad}    {value} = {var}[{key!r}]"] + body
+        if object_lines:
+            blocks.append(('dict', object_lines))
+        if 'items' in schema:
+            index, value = self.variable('i'), self.variable('v')
+            body = self.emit(schema['items'], value, f"{path} + '/' + str({index})", errors, len(pad) // 4 + 1)
+            if body:
+                blocks.append(('list', [f"{pad}for {index}, {value} in enumerate({var}):"] + body))
+
+        lines = []
+        for guard, block in blocks:
+            lines += block if typed else [f"{'    ' * depth}if isinstance({var}, {guard}):"] + block
+        if 'if' in schema and 'then' in schema:
+            pad = '    ' * depth
+            probe = self.variable('e')
+            lines += [f"{pad}{probe} = []"] + self.emit(schema['if'], var, path, probe, depth)
+            lines += [f"{pad}if not {probe}:"]
+            lines += self.emit(schema['then'], var, path, errors, depth + 1) or [f"{pad}    pass"]
+        return lines
+
+def compile_schema(schema: Dict) -> Callable[[Any], List[Dict]]:
+    """Compile a schema once; the returned function gives [{path, message}] (empty when valid)"""
+    check = SchemaCompiler(schema).compile()
+
+    def validate(data: Any) -> List[Dict]:
+        errors: List[Tuple[str, str]] = []
+        check(data, '', errors)
+        return [{"path": path or '/', "message": message} for path, message in errors]
+
+    return validate
+
+@lru_cache(maxsize=None)
+def service_definition_validator() -> Callable[[Any], List[Dict]]:
+    return compile_schema(SERVICE_DEFINITION_SCHEMA)
+
+def validate_service_definition(service_json: Any) -> List[Dict]:
+    """Check a generated service definition against SERVICE_DEFINITION_SCHEMA"""
+    if not isinstance(service_json, dict):
+        # A list, string or null from a bad JSON file: reported as a root-level type error
+        return service_definition_validator()(service_json)
+    return service_definition_validator()(resolve_configuration_refs(service_json))
+
+DEFAULT_CART_LIMIT = 30
+DEFAULT_LOCATION_TYPES = ['AT_PIN']
+
+def parse_int_cell(value: Any, default: int) -> int:
+    """Integer from an Excel/CSV cell: 500, 500.0, "1,000" → int; blank or non-numeric → default"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return default
+    if isinstance(value, (bool, np.bool_)):
+        return default
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    text = str(value).strip().replace(',', '')
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return int(float(text))
+    except ValueError:
+        return default
+
+def parse_location_types(value: Any) -> List[str]:
+    """'AT_PIN, AT_STORE' / 'At pin\nAt store' → ['AT_PIN', 'AT_STORE']; blank → ['AT_PIN']"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return list(DEFAULT_LOCATION_TYPES)
+    location_types = [
+        '_'.join(loc.split()).upper()
+        for loc in re.split(r'[,\n]', str(value))
+        if loc.strip() and loc.strip().lower() != 'nan'
+    ]
+    return location_types or list(DEFAULT_LOCATION_TYPES)
+
+def text_or(value: Any, fallback: Any) -> Any:
+    """Cell value, or fallback when the cell is blank/NaN"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)) or value == '':
+        return fallback
+    return value
+
+def prepare_mint_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Use row 0 as headers (stripped) and return the data rows"""
+    headers = df.iloc[0].tolist()
+    df_data = df.iloc[1:].copy()
+    df_data.columns = headers
+    df_data.columns = df_data.columns.str.strip()
+    return df_data
+
+def find_subcat_column(columns) -> Optional[str]:
+    for col in columns:
+        if isinstance(col, str) and 'subcat' in col.lower() and 'thai' in col.lower():
+            return col
+    return None
+
+def build_package(row: Dict, package_name: str, package_id: str) -> Dict:
+    return {
+        "id": package_id,
         "note": {
-            "placeholder": create_i18n_text("service_definition.note.placeholder")
+            "placeholder": str(row.get('other text field - placeholder', 'ระบุข้อมูลเพิ่มเติม'))
+        },
+        "image": {
+            "cover": "https://example.com/inspection-cover.jpg",
+            "thumbnail": "https://example.com/inspection-thumb.jpg"
+        },
+        "title": create_inline_text(package_name, package_name),
+        "quantity": {
+            "validation": {
+                "max": parse_int_cell(row.get('max'), 10),
+                "min": parse_int_cell(row.get('min'), 1)
+            },
+            "placeholder": create_inline_text(
+                str(row.get('quantity.placeholder', 'จำนวน')),
+                "Quantity"
+            )
+        },
+        "base_price": parse_int_cell(row.get('Starting price'), 0),
+        "description": create_inline_text(
+            str(row.get('Package Description', '')),
+            str(row.get('Package Description', ''))
+        ),
+        "configurations": []
+    }
+
+def build_configuration(row: Dict, items: List[Dict], config_number: int) -> Optional[Dict]:
+    """Configuration for a package row / continuation row, or None if the row has none"""
+    config_type = str(row.get('Configurations.type', 'NONE')).strip().upper()
+    
+    # Skip if NONE or NAN or empty
+    if config_type in ['NONE', 'NAN', ''] or pd.isna(row.get('Configurations.type')):
+        return None
+    
+    # Create config only if it has items (RADIO, CHECKBOX) or is DATE_TIME_RANGE (no items needed)
+    if not items and config_type != "DATE_TIME_RANGE":
+        return None
+    
+    config_text = row.get('Package Detail selection ( Configuration )')
+    config_title_raw = row.get('Configurations.title')
+    config_id_raw = row.get('Configurations.id')
+    has_config_id = config_id_raw is not None and pd.notna(config_id_raw)
+    config_id = str(config_id_raw) if has_config_id else f'config-{config_number:03d}'
+    
+    # Smart title detection
+    if pd.notna(config_title_raw) and str(config_title_raw).lower() not in ['nan', '']:
+        config_title = str(config_title_raw)
+    elif config_text is not None and pd.notna(config_text):
+        # Try to get title from first line of config_text
+        first_line = str(config_text).split('\n')[0].strip()
+        # Remove price info if exists
+        if ':' in first_line and any(c.isdigit() for c in first_line):
+            config_title = first_line.split(':')[0].strip()
+        else:
+            config_title = first_line if len(first_line) < 50 else config_id if has_config_id else "ตัวเลือก"
+    elif has_config_id:
+        config_title = config_id
+    else:
+        config_title = "ตัวเลือก"
+    
+    return {
+        "id": config_id,
+        "data": {
+            "items": items
+        },
+        "type": config_type,
+        "title": config_title,
+        "validation": {
+            "required": config_type == "RADIO"
         },
-        "title": create_inline_text(service_title_th, service_title_en),
+        "description": None,
+        "default_value": None
+    }
+
+def build_service_json(service_id: str, title: Dict, packages: List[Dict], cart_limit: int,
+                       service_location_types: List[str], include_note: bool = True) -> Dict:
+    """Service definition shell shared by the single-service and per-category outputs"""
+    default_location_type = service_location_types[0] if service_location_types else "AT_PIN"
+    result = {"id": service_id}
+    if include_note:
+        result["note"] = {
+            "placeholder": create_i18n_text("service_definition.note.placeholder")
+        }
+    result.update({
+        "title": title,
         "packages": packages,
         "cart_limit": cart_limit,
         "components": {
@@ -299,7 +719,7 @@ def convert_mint_excel_to_json(df: pd.DataFrame, service_id: str = None,
                 },
                 "visible": True,
                 "service_location_types": service_location_types,
-                "default_service_location_type": service_location_types[0] if service_location_types else "AT_PIN"
+                "default_service_location_type": default_location_type
             },
             "cashback_section": {
                 "icon": "point_icon",
@@ -338,7 +758,7 @@ def convert_mint_excel_to_json(df: pd.DataFrame, service_id: str = None,
                     },
                     "visible": True,
                     "service_location_types": service_location_types,
-                    "default_service_location_type": service_location_types[0] if service_location_types else "AT_PIN"
+                    "default_service_location_type": default_location_type
                 },
                 "date_time": {
                     "visible": True,
@@ -351,9 +771,1487 @@ def convert_mint_excel_to_json(df: pd.DataFrame, service_id: str = None,
         },
         "cover_image": "https://example.com/service-cover.jpg",
         "service_location_types": service_location_types
+    })
+    return result
+
+# pandas reads sheet row 1 as column names, so frame label 0 is sheet row 2 (the Mint header row)
+SHEET_ROW_OFFSET = 2
+
+# JSON field path (after the package / configuration / category) → Mint header it comes from;
+# the longest matching prefix wins
+PACKAGE_FIELD_COLUMNS = {
+    (): 'Package Name',
+    ('id',): 'Package Id',
+    ('title',): 'Package Name',
+    ('description',): 'Package Description',
+    ('base_price',): 'Starting price',
+    ('note',): 'other text field - placeholder',
+    ('quantity',): 'min',
+    ('quantity', 'validation', 'min'): 'min',
+    ('quantity', 'validation', 'max'): 'max',
+    ('quantity', 'placeholder'): 'quantity.placeholder',
+    ('configurations',): 'Configurations.type'
+}
+CONFIGURATION_FIELD_COLUMNS = {
+    (): 'Configurations.title',
+    ('id',): 'Configurations.id',
+    ('type',): 'Configurations.type',
+    ('title',): 'Configurations.title',
+    ('validation',): 'Configurations.type',
+    ('data',): 'Package Detail selection ( Configuration )'
+}
+CATEGORY_FIELD_COLUMNS = {
+    (): 'Category slug',
+    ('id',): 'Category slug',
+    ('title',): 'Subcat thai',
+    ('title', 'values', 'en'): 'Category',
+    ('cart_limit',): 'Cart limit',
+    ('service_location_types',): 'service_location_types',
+    ('components',): 'service_location_types'
+}
+
+def excel_column_letter(position: int) -> str:
+    """0 → A, 25 → Z, 26 → AA"""
+    letters = ''
+    position += 1
+    while position:
+        position, remainder = divmod(position - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def field_column(columns: Dict[Tuple, str], fields: List[str]) -> str:
+    for length in range(len(fields), -1, -1):
+        header = columns.get(tuple(fields[:length]))
+        if header:
+            return header
+    return columns[()]
+
+class SourceMap:
+    """
+    JSON path ⇄ sheet cell index of one upload, kept in flat integer arrays.
+    
+    Packages and configurations are numbered in the order they are built.
+    Package p of a category is category_packages[c][p] (package_indexes is the
+    inverse); configuration k of
+    package g is configuration_offsets[g] + k, item i of configuration n is
+    item_offsets[n] + i. row_packages / row_configurations map every data row
+    back to what it produced, so both directions are O(1).
+    
+    Positions are data rows in prepare_mint_frame order; sheet_rows turns them
+    into spreadsheet row numbers (CSV blank lines are not counted by pandas).
+    """
+
+    def __init__(self, df_data: pd.DataFrame, source_columns: Optional[List[int]] = None,
+                 subcat_column: Optional[str] = None):
+        row_count = len(df_data)
+        if pd.api.types.is_integer_dtype(df_data.index):
+            self.sheet_rows = array('q', (int(label) + SHEET_ROW_OFFSET for label in df_data.index))
+        else:
+            self.sheet_rows = array('q', range(SHEET_ROW_OFFSET + 1, SHEET_ROW_OFFSET + 1 + row_count))
+        self.positions_by_sheet_row = array('q', [-1]) * ((max(self.sheet_rows) + 1) if row_count else 0)
+        for position, sheet_row in enumerate(self.sheet_rows):
+            self.positions_by_sheet_row[sheet_row] = position
+
+        # Pruned reads keep the original sheet positions in df.attrs['source_columns']
+        source_columns = source_columns or list(range(df_data.shape[1]))
+        self.column_letters = {
+            header: excel_column_letter(source_columns[i]) for i, header in enumerate(df_data.columns)
+        }
+        self.subcat_column = subcat_column
+
+        self.slugs: List[Any] = []
+        self.slug_numbers: Dict[Any, int] = {}
+        self.category_packages: List[array] = []
+        self.category_info_rows = array('q')
+        self.category_location_rows = array('q')
+        self.package_categories = array('q')
+        self.package_indexes = array('q')
+        self.package_rows = array('q')
+        self.package_ends = array('q')
+        self.configuration_offsets = array('q')
+        self.configuration_rows = array('q')
+        self.item_offsets = array('q', [0])
+        self.row_packages = array('q', [-1]) * row_count
+        self.row_configurations = array('q', [-1]) * row_count
+
+    def category_number(self, slug: Any) -> int:
+        if slug not in self.slug_numbers:
+            self.slug_numbers[slug] = len(self.slugs)
+            self.slugs.append(slug)
+            self.category_packages.append(array('q'))
+            self.category_info_rows.append(-1)
+            self.category_location_rows.append(-1)
+        return self.slug_numbers[slug]
+
+    def set_category_row(self, slug: Any, position: int, location: bool = False):
+        """Row the category's title / cart limit (or location types) were read from; the first row wins"""
+        rows = self.category_location_rows if location else self.category_info_rows
+        category = self.category_number(slug)
+        if rows[category] < 0 or position < rows[category]:
+            rows[category] = position
+
+    def add_package(self, slug: Any, position: int):
+        """A package row; slug None for packages outside any category"""
+        package = len(self.package_rows)
+        category = self.category_number(slug) if slug is not None else -1
+        self.package_indexes.append(len(self.category_packages[category]) if category >= 0 else -1)
+        if category >= 0:
+            self.category_packages[category].append(package)
+        self.package_categories.append(category)
+        self.package_rows.append(position)
+        self.package_ends.append(position + 1)
+        self.configuration_offsets.append(len(self.configuration_rows))
+        self.row_packages[position] = package
+
+    def add_row(self, position: int):
+        """A continuation row of the last package"""
+        package = len(self.package_rows) - 1
+        self.row_packages[position] = package
+        self.package_ends[package] = position + 1
+
+    def add_configuration(self, position: int, item_count: int):
+        """A configuration of the last package, built from this row"""
+        self.row_configurations[position] = len(self.configuration_rows)
+        self.configuration_rows.append(position)
+        self.item_offsets.append(self.item_offsets[-1] + item_count)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [
+            self.sheet_rows, self.positions_by_sheet_row, self.category_info_rows,
+            self.category_location_rows, self.package_categories, self.package_indexes, self.package_rows,
+            self.package_ends, self.configuration_offsets, self.configuration_rows,
+            self.item_offsets, self.row_packages, self.row_configurations, *self.category_packages
+        ]
+        return sum(len(values) * values.itemsize for values in arrays)
+
+    def package_number(self, slug: Any, package_index: int) -> Optional[int]:
+        category = self.slug_numbers.get(slug)
+        if category is None or not 0 <= package_index < len(self.category_packages[category]):
+            return None
+        return self.category_packages[category][package_index]
+
+    def configuration_count(self, package: int) -> int:
+        end = (self.configuration_offsets[package + 1] if package + 1 < len(self.configuration_offsets)
+               else len(self.configuration_rows))
+        return end - self.configuration_offsets[package]
+
+    def package_positions(self, slug: Any, package_index: int) -> range:
+        """Data-row positions of a package: its package row and the continuation rows below it"""
+        package = self.package_number(slug, package_index)
+        if package is None:
+            return range(0)
+        return range(self.package_rows[package], self.package_ends[package])
+
+    def cell(self, position: int, header: str) -> Dict:
+        if header == 'Subcat thai' and self.subcat_column:
+            header = self.subcat_column
+        column = self.column_letters.get(header)
+        sheet_row = self.sheet_rows[position]
+        return {
+            'position': position,
+            'row': sheet_row,
+            'header': header,
+            'column': column,
+            'cell': f"{column}{sheet_row}" if column else None
+        }
+
+    def locate(self, slug: Any, path: str) -> Optional[Dict]:
+        """
+        Sheet cell a JSON path of a category came from, e.g.
+        "/packages/2/configurations/0/data/items/3" → {'row': 14, 'column': 'O', 'cell': 'O14', ...}.
+        None when the path is not backed by a row.
+        """
+        parts = [part for part in path.split('/') if part]
+        category = self.slug_numbers.get(slug)
+        if category is None:
+            return None
+        if not parts or parts[0] != 'packages' or len(parts) < 2:
+            location = parts[:1] in (['service_location_types'], ['components'])
+            rows = self.category_location_rows if location else self.category_info_rows
+            position = rows[category]
+            if position < 0 and location:
+                position = self.category_info_rows[category]
+            return self.cell(position, field_column(CATEGORY_FIELD_COLUMNS, parts)) if position >= 0 else None
+
+        if not parts[1].isdigit():
+            return None
+        package = self.package_number(slug, int(parts[1]))
+        if package is None:
+            return None
+        fields = parts[2:]
+        if fields[:1] != ['configurations'] or len(fields) < 2 or not fields[1].isdigit():
+            return self.cell(self.package_rows[package], field_column(PACKAGE_FIELD_COLUMNS, fields))
+
+        config_index = int(fields[1])
+        if config_index >= self.configuration_count(package):
+            return None
+        configuration = self.configuration_offsets[package] + config_index
+        fields = fields[2:]
+        if fields[:2] == ['data', 'items'] and len(fields) > 2 and fields[2].isdigit():
+            if int(fields[2]) >= self.item_offsets[configuration + 1] - self.item_offsets[configuration]:
+                return None
+        return self.cell(self.configuration_rows[configuration], field_column(CONFIGURATION_FIELD_COLUMNS, fields))
+
+    def locate_row(self, sheet_row: int) -> Optional[Dict]:
+        """JSON path a sheet row produced: {'slug', 'package', 'configuration', 'path'}"""
+        if not 0 <= sheet_row < len(self.positions_by_sheet_row):
+            return None
+        position = self.positions_by_sheet_row[sheet_row]
+        if position < 0 or self.row_packages[position] < 0:
+            return None
+        package = self.row_packages[position]
+        category = self.package_categories[package]
+        if category < 0:
+            return None
+        slug = self.slugs[category]
+        package_index = self.package_indexes[package]
+        path = f"/packages/{package_index}"
+        configuration = self.row_configurations[position]
+        config_index = None
+        if configuration >= 0:
+            config_index = configuration - self.configuration_offsets[package]
+            path += f"/configurations/{config_index}"
+        return {'slug': slug, 'package': package_index, 'configuration': config_index, 'path': path}
+
+def walk_mint_records(records: List[Dict], config_items: List[List[Dict]],
+                      interner: "ConfigurationInterner", source_map: Optional[SourceMap] = None,
+                      positions: Optional[List[int]] = None) -> Dict:
+    """
+    Walk data rows once: build packages, attach configurations and group
+    packages by category slug.
+    
+    Rows without Package Name are continuation rows: their configuration is added
+    to the package above. Rows without Category slug inherit the one above.
+    With a source_map, every package / configuration is recorded at
+    positions[i] (the record's data row in the full sheet; -1 = not recorded).
+    """
+    packages = []
+    categories: Dict[Any, Dict] = {}
+    first_package_row = None
+    current_slug = None
+    current_package = None
+    config_type_counts: Dict[str, int] = {}
+    item_count = 0
+    if source_map is not None and positions is None:
+        positions = range(len(records))
+    
+    for position, row in enumerate(records):
+        source_position = positions[position] if source_map is not None else -1
+        # Category slug is written once per category; later rows inherit it
+        slug_value = row.get('Category slug')
+        if slug_value is not None and pd.notna(slug_value):
+            current_slug = slug_value
+        category = None
+        if current_slug is not None:
+            category = categories.setdefault(current_slug, {
+                'packages': [], 'info_row': None, 'location_types': None
+            })
+            if category['info_row'] is None and pd.notna(row.get('Category')):
+                category['info_row'] = row
+                if source_position >= 0:
+                    source_map.set_category_row(current_slug, source_position)
+        
+        # New package row (has Package Name)
+        package_name_raw = row.get('Package Name')
+        if package_name_raw is not None and pd.notna(package_name_raw) and str(package_name_raw).strip():
+            current_package = None
+            package_name = str(package_name_raw).strip()
+            package_id = str(row.get('Package Id')).strip()
+            if not package_id:
+                continue
+            
+            current_package = build_package(row, package_name, package_id)
+            packages.append(current_package)
+            if source_position >= 0:
+                source_map.add_package(current_slug if category is not None else None, source_position)
+            if first_package_row is None:
+                first_package_row = row
+            if category is not None:
+                category['packages'].append(current_package)
+                # Like Category / Cart limit, location types are usually filled on the first row only
+                if category['location_types'] is None and pd.notna(row.get('service_location_types')):
+                    category['location_types'] = parse_location_types(row.get('service_location_types'))
+                    if source_position >= 0:
+                        source_map.set_category_row(current_slug, source_position, location=True)
+        elif current_package and source_position >= 0:
+            source_map.add_row(source_position)
+        
+        # Configuration (for both new package and additional config rows)
+        if current_package:
+            config = build_configuration(
+                row, config_items[position], len(current_package["configurations"]) + 1
+            )
+            if config:
+                current_package["configurations"].append(interner.intern(config))
+                if source_position >= 0:
+                    source_map.add_configuration(source_position, len(config["data"]["items"]))
+                config_type_counts[config["type"]] = config_type_counts.get(config["type"], 0) + 1
+                item_count += len(config["data"]["items"])
+    
+    return {
+        "packages": packages,
+        "categories": categories,
+        "first_package_row": first_package_row,
+        "configuration_types": config_type_counts,
+        "items": item_count
     }
+
+def category_titles(category_slug: Any, info_row: Optional[Dict],
+                    subcat_column: Optional[str]) -> Tuple[Any, Any, int]:
+    """(category_name, subcat_thai, cart_limit) from the category's first row with Category"""
+    if info_row is None:
+        category_name = str(category_slug).replace('-', ' ').title()
+        return category_name, category_name, DEFAULT_CART_LIMIT
+    category_name = info_row.get('Category', category_slug)
+    subcat_thai = text_or(info_row.get(subcat_column) if subcat_column else None, category_name)
+    return category_name, subcat_thai, parse_int_cell(info_row.get('Cart limit'), DEFAULT_CART_LIMIT)
+
+def build_category_result(category_slug: Any, category: Dict, subcat_column: Optional[str]) -> Dict:
+    """split_by_category entry {json, category_name, subcat_thai, packages_count, schema_errors}"""
+    category_name, subcat_thai, cart_limit = category_titles(
+        category_slug, category['info_row'], subcat_column
+    )
+    category_json = build_service_json(
+        category_slug,
+        create_inline_text(subcat_thai, category_name),
+        category['packages'],
+        cart_limit,
+        category['location_types'] or list(DEFAULT_LOCATION_TYPES),
+        include_note=False
+    )
+    return {
+        'json': category_json,
+        'category_name': category_name,
+        'subcat_thai': subcat_thai,
+        'packages_count': len(category['packages']),
+        'schema_errors': validate_service_definition(category_json)
+    }
+
+def convert_mint_frame(df: pd.DataFrame, service_id: str = None,
+                       service_title_th: str = None,
+                       service_title_en: str = None,
+                       source_map: bool = False) -> Dict:
+    """
+    One-pass conversion engine behind convert_mint_excel_to_json and split_by_category.
     
-    return result
+    Reads the frame once (row 0 = headers), parses the configuration column once,
+    and walks the rows a single time. Every package is built once and shared by
+    both outputs.
+    
+    Returns:
+    - service: single-service JSON (None if the sheet has no packages)
+    - categories: {slug: {json, category_name, subcat_thai, packages_count, schema_errors}}
+    - stats: category_results_stats of the categories (rows, packages, configurations by type, items, ...)
+    - source_map: SourceMap of the sheet when source_map=True, else None
+    """
+    df_data = prepare_mint_frame(df)
+    subcat_column = find_subcat_column(df_data.columns)
+    source = SourceMap(df_data, df.attrs.get('source_columns'), subcat_column) if source_map else None
+    
+    # Parse every configuration cell in one pass
+    config_items = parse_configuration_column(
+        df_data.get('Package Detail selection ( Configuration )', pd.Series(index=df_data.index, dtype=object))
+    ).tolist()
+    interner = ConfigurationInterner()
+    walk = walk_mint_records(df_data.to_dict('records'), config_items, interner, source)
+    packages = walk['packages']
+    first_package_row = walk['first_package_row']
+    
+    # Per-category outputs, in order of first appearance
+    results = {
+        category_slug: build_category_result(category_slug, category, subcat_column)
+        for category_slug, category in walk['categories'].items()
+    }
+    
+    # Single-service output: metadata from the first package row
+    service = None
+    if first_package_row is not None:
+        category_name = first_package_row.get('Category', 'Service')
+        subcat_thai = first_package_row.get(subcat_column, '') if subcat_column else ''
+        if not service_id:
+            service_id = str(first_package_row.get('Category slug', 'service-001')).strip()
+        if not service_title_th:
+            service_title_th = text_or(subcat_thai, category_name)
+        if not service_title_en:
+            service_title_en = category_name
+        service = build_service_json(
+            service_id,
+            create_inline_text(service_title_th, service_title_en),
+            packages,
+            parse_int_cell(first_package_row.get('Cart limit'), DEFAULT_CART_LIMIT),
+            parse_location_types(first_package_row.get('service_location_types'))
+        )
+    
+    # From the per-category results, exactly as convert_mint_frame_sharded computes them
+    # (packages without a Category slug are in the service output but not counted)
+    stats = category_results_stats(results, len(df_data))
+    
+    return {"service": service, "categories": results, "stats": stats, "source_map": source}
+
+def convert_mint_excel_to_json(df: pd.DataFrame, service_id: str = None, 
+                                service_title_th: str = None,
+                                service_title_en: str = None) -> Dict:
+    """
+    Convert Mint Excel format to JSON structure
+    
+    Excel columns (from row 0):
+    - Category, Subcat thai, Category slug, Cart limit
+    - Package Name, Package Id, Package Description
+    - Starting price, min, max, quantity.placeholder
+    - Configurations.title, Package Detail selection ( Configuration ), Configurations.id, Configurations.type
+    - Configurations.title.2, Package Detail selection ( Configuration ).2, Configurations.id.2, Configurations.type.2
+    - Configurations.title.3, Package Detail selection ( Configuration ).3, Configurations.id.3, Configurations.type.3
+    - (Support up to 5 configurations per package)
+    - other text field - placeholder
+    - service_location_types, Location type, marketplace subcategory
+    
+    Configuration Types:
+    - NONE = no configuration (configurations: [])
+    - RADIO = radio buttons (single select)
+    - CHECKBOX = checkboxes (multiple select)
+    - DATE_TIME_RANGE = date/time range picker
+    """
+    result = convert_mint_frame(df, service_id, service_title_th, service_title_en)
+    if result["service"] is None:
+        raise ValueError("ไม่พบ package ในไฟล์ (คอลัมน์ Package Name ว่างทั้งหมด)")
+    return result["service"]
+
+def mint_column(df_data: pd.DataFrame, name: str) -> pd.Series:
+    """Column by header (the last one if repeated, as in to_dict('records')); all-NaN if missing"""
+    column = df_data.get(name)
+    if column is None:
+        return pd.Series(index=df_data.index, dtype=object)
+    if isinstance(column, pd.DataFrame):
+        return column.iloc[:, -1]
+    return column
+
+def column_index(headers: List, columns: List[List], name: str) -> int:
+    """Position of the (last) column with this header; appends an all-None column if missing"""
+    for i in range(len(headers) - 1, -1, -1):
+        if headers[i] == name:
+            return i
+    headers.append(name)
+    columns.append([None] * (len(columns[0]) if columns else 0))
+    return len(headers) - 1
+
+def chunk_column(chunk: Dict, name: str) -> List:
+    """Values of one column of a category chunk (all None if the sheet has no such column)"""
+    headers, columns = chunk['headers'], chunk['columns']
+    for i in range(len(headers) - 1, -1, -1):
+        if headers[i] == name:
+            return columns[i]
+    return [None] * (len(columns[0]) if columns else 0)
+
+def convert_category_chunk(chunk: Dict, subcat_column: Optional[str],
+                           interner: Optional["ConfigurationInterner"] = None,
+                           config_items: Optional[List[List[Dict]]] = None,
+                           source_map: Optional[SourceMap] = None) -> Dict:
+    """split_by_category entry for one category chunk (see LazyCategoryResults.category_chunk)"""
+    if config_items is None:
+        config_items = parse_configuration_column(pd.Series(
+            chunk_column(chunk, 'Package Detail selection ( Configuration )'), dtype=object
+        )).tolist()
+    records = [dict(zip(chunk['headers'], values)) for values in zip(*chunk['columns'])]
+    walk = walk_mint_records(
+        records, config_items, interner or ConfigurationInterner(), source_map, chunk.get('rows')
+    )
+    category = walk['categories'].get(chunk['slug'])
+    if category is None:
+        category = {'packages': [], 'info_row': None, 'location_types': None}
+    return build_category_result(chunk['slug'], category, subcat_column)
+
+class LazyCategoryResults(Mapping):
+    """
+    split_by_category results that convert on demand.
+    
+    The category index (slug, category_name, subcat_thai, packages_count) is
+    built from a few column operations without building any package; a
+    category's rows are converted the first time it is accessed and memoized.
+    Entries are identical to the eager split_by_category output. With
+    source_map=True, self.source_map fills in as categories are converted.
+    """
+
+    def __init__(self, df: pd.DataFrame, source_map: bool = False):
+        df_data = prepare_mint_frame(df)
+        self.df_data = df_data
+        self.subcat_column = find_subcat_column(df_data.columns)
+        self.converted: Dict[Any, Dict] = {}
+        self.source_map = (
+            SourceMap(df_data, df.attrs.get('source_columns'), self.subcat_column) if source_map else None
+        )
+        self.mapped = set()
+
+        positions = np.arange(len(df_data))
+        slugs = mint_column(df_data, 'Category slug').ffill().to_numpy(dtype=object)
+
+        # Same package-row test as walk_mint_records; a blank Package Id ends the package
+        names = mint_column(df_data, 'Package Name')
+        is_package = (names.notna() & names.astype(str).str.strip().ne('')).to_numpy()
+        if 'Package Id' in df_data.columns:
+            has_id = mint_column(df_data, 'Package Id').astype(str).str.strip().ne('').to_numpy()
+        else:
+            has_id = np.ones(len(df_data), dtype=bool)
+        package_start = np.where(is_package, np.where(has_id, positions, -1), np.nan)
+        owner = pd.Series(package_start).ffill().fillna(-1).astype(int).to_numpy()
+
+        # Category of the package each row belongs to (continuation rows follow their package)
+        self.row_slugs = slugs
+        self.owner_slugs = np.where(owner >= 0, slugs[owner.clip(min=0)], None)
+        owned = pd.Series(positions).groupby(self.owner_slugs, sort=False).indices
+
+        has_category = mint_column(df_data, 'Category').notna().to_numpy() & pd.notna(slugs)
+        info_positions = pd.Series(positions[has_category]).groupby(
+            slugs[has_category], sort=False
+        ).first().to_dict()
+        self.info_positions = info_positions
+        package_counts = pd.Series(
+            slugs[is_package & has_id & pd.notna(slugs)]
+        ).value_counts().to_dict()
+
+        self.category_rows: Dict[Any, np.ndarray] = {}
+        self.index: Dict[Any, Dict] = {}
+        for slug in pd.unique(slugs[pd.notna(slugs)]):
+            info_position = info_positions.get(slug)
+            rows = owned.get(slug, np.array([], dtype=int))
+            if info_position is not None:
+                rows = np.union1d(rows, [info_position])
+            self.category_rows[slug] = rows
+            info_row = df_data.iloc[info_position].to_dict() if info_position is not None else None
+            category_name, subcat_thai, _cart_limit = category_titles(slug, info_row, self.subcat_column)
+            self.index[slug] = {
+                'category_name': category_name,
+                'subcat_thai': subcat_thai,
+                'packages_count': package_counts.get(slug, 0)
+            }
+
+        # Held until every category is converted; counted against the result store budget
+        self.nbytes = int(df_data.memory_usage(deep=True).sum()) + sum(
+            values.nbytes for values in (self.row_slugs, self.owner_slugs, *self.category_rows.values())
+        )
+
+    def category_chunk(self, slug: Any) -> Dict:
+        """
+        One category's rows (its packages, their continuation rows and its info row)
+        as plain column lists: {'slug', 'headers', 'columns', 'rows'}. Cheap to pickle
+        and converted by convert_category_chunk without the rest of the sheet.
+        'rows' are the data-row positions (-1 for a borrowed info row).
+        """
+        rows = self.category_rows[slug]
+        headers = list(self.df_data.columns)
+        # Object columns convert without a copy, so no second copy of the sheet is kept
+        columns = [self.df_data.iloc[:, i].to_numpy(dtype=object)[rows].tolist()
+                   for i in range(self.df_data.shape[1])]
+
+        # Slug as inherited in the full sheet, which may start before these rows
+        columns[column_index(headers, columns, 'Category slug')] = self.row_slugs[rows].tolist()
+        # The info row may belong to another category's package: keep it for Category / Cart limit only
+        borrowed = self.owner_slugs[rows] != slug
+        if borrowed.any():
+            config_types = columns[column_index(headers, columns, 'Configurations.type')]
+            for i in np.flatnonzero(borrowed):
+                config_types[i] = None
+        return {
+            'slug': slug, 'headers': headers, 'columns': columns,
+            'rows': np.where(borrowed, -1, rows).tolist()
+        }
+
+    def convert(self, slug: Any, config_items: Optional[List[List[Dict]]] = None) -> Dict:
+        """Convert one category; config_items (parsed for this category's rows) skips the per-category parse"""
+        # A category converted again after its memo was dropped is already in the map
+        source_map = self.source_map if slug not in self.mapped else None
+        self.mapped.add(slug)
+        if source_map is not None and slug in self.info_positions:
+            # The info row may be borrowed (-1 in the chunk); its position is known here
+            source_map.set_category_row(slug, int(self.info_positions[slug]))
+        # A fresh interner per category: a shared one would keep every converted
+        # configuration (and its JSON key) alive after the store drops the category
+        return convert_category_chunk(
+            self.category_chunk(slug), self.subcat_column, ConfigurationInterner(), config_items, source_map
+        )
+
+    def __getitem__(self, slug: Any) -> Dict:
+        if slug not in self.converted:
+            if slug not in self.index:
+                raise KeyError(slug)
+            self.converted[slug] = self.convert(slug)
+        return self.converted[slug]
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+# Shards per worker process; a few more than workers evens out uneven categories
+SHARDS_PER_WORKER = 4
+
+def convert_category_chunks(chunks: List[Dict], subcat_column: Optional[str]) -> List[Tuple[Any, Dict]]:
+    """Convert one shard of category chunks (runs inside a worker process)"""
+    interner = ConfigurationInterner()
+    # One parse for the whole shard (repeated option blocks parsed once), then sliced per category
+    config_texts = [
+        text for chunk in chunks
+        for text in chunk_column(chunk, 'Package Detail selection ( Configuration )')
+    ]
+    config_items = parse_configuration_column(pd.Series(config_texts, dtype=object)).tolist()
+    converted, offset = [], 0
+    for chunk in chunks:
+        row_count = len(chunk['columns'][0]) if chunk['columns'] else 0
+        converted.append((chunk['slug'], convert_category_chunk(
+            chunk, subcat_column, interner, config_items[offset:offset + row_count]
+        )))
+        offset += row_count
+    return converted
+
+def partition_chunks(chunks: List[Dict], shard_count: int) -> List[List[Dict]]:
+    """Split category chunks into contiguous shards of roughly equal row counts (order kept)"""
+    sizes = [len(chunk['columns'][0]) if chunk['columns'] else 0 for chunk in chunks]
+    target = max(1, sum(sizes) / max(1, shard_count))
+    shards, current, current_rows = [], [], 0
+    for chunk, size in zip(chunks, sizes):
+        current.append(chunk)
+        current_rows += size
+        if current_rows >= target and len(shards) < shard_count - 1:
+            shards.append(current)
+            current, current_rows = [], 0
+    if current:
+        shards.append(current)
+    return shards
+
+def category_results_stats(results: Mapping, rows: int) -> Dict:
+    """Stats of split_by_category results (the stats of convert_mint_frame and its sharded variant)"""
+    packages = [pkg for result in results.values() for pkg in result['json']['packages']]
+    configurations = [config for pkg in packages for config in pkg['configurations']]
+    config_type_counts: Dict[str, int] = {}
+    for config in configurations:
+        config_type_counts[config['type']] = config_type_counts.get(config['type'], 0) + 1
+    return {
+        "rows": rows,
+        "packages": len(packages),
+        "packages_with_configurations": sum(1 for pkg in packages if pkg['configurations']),
+        "categories": len(results),
+        "configurations": len(configurations),
+        "configuration_types": config_type_counts,
+        "items": sum(len(config['data']['items']) for config in configurations),
+        # Interned configurations are shared objects: serialize each object once, not each use
+        "distinct_configurations": len({
+            ConfigurationInterner.key(config) for config in {id(config): config for config in configurations}.values()
+        }),
+        "schema_errors": sum(len(result['schema_errors']) for result in results.values())
+    }
+
+def convert_mint_frame_sharded(df: pd.DataFrame, workers: Optional[int] = None,
+                               executor: Optional[ProcessPoolExecutor] = None) -> Dict:
+    """
+    Convert a large sheet with categories spread across worker processes.
+    
+    Categories are partitioned with LazyCategoryResults (continuation rows stay
+    with their package) and sent as plain column lists, not DataFrames.
+    Returns {"categories": ..., "stats": ...} like convert_mint_frame, with
+    categories in original order; packages without a Category slug are not counted.
+    """
+    index = LazyCategoryResults(df)
+    workers = workers or os.cpu_count() or 1
+    chunks = [index.category_chunk(slug) for slug in index]
+    shards = partition_chunks(chunks, workers * SHARDS_PER_WORKER)
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(
+            max_workers=min(workers, max(1, len(shards))),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    try:
+        shard_results = list(executor.map(
+            convert_category_chunks, shards, [index.subcat_column] * len(shards)
+        ))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    results = {slug: result for shard in shard_results for slug, result in shard}
+    stats = {**category_results_stats(results, len(index.df_data)), "shards": len(shards)}
+    return {"categories": results, "stats": stats}
+
+# Field → rank weight for search hits (higher first)
+SEARCH_FIELD_WEIGHTS = {'package': 5, 'package_id': 4, 'configuration': 3, 'item': 2, 'description': 1}
+
+def normalize_search_text(text: Any) -> str:
+    """NFC, case-folded, whitespace collapsed; blank / 'nan' cells → ''"""
+    if text is None:
+        return ''
+    normalized = ' '.join(unicodedata.normalize('NFC', str(text)).casefold().split())
+    return '' if normalized == 'nan' else normalized
+
+def char_ngrams(text: str, n: int) -> set:
+    """Overlapping character n-grams (Thai is written without spaces between words)"""
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+class PackageSearchIndex:
+    """
+    In-memory inverted index over package titles, ids, descriptions,
+    configuration titles and option values of every category.
+    
+    Text is split into character n-grams rather than words. A query looks up
+    the postings of its own n-grams, intersects them (smallest first) and
+    confirms the remaining entries with a substring check, so results are
+    exact substring matches.
+    """
+
+    def __init__(self, n: int = 2):
+        self.n = n
+        # (slug, package_id, package_title, field, configuration_title, text, normalized)
+        self.entries: List[Tuple] = []
+        self.postings: Dict[str, List[int]] = {}
+        # Approximate memory use, kept up to date as entries are added
+        self.nbytes = 0
+
+    def add_entry(self, slug: Any, package: Dict, field: str, text: Any,
+                  configuration_title: Optional[str] = None):
+        normalized = normalize_search_text(text)
+        if not normalized:
+            return
+        entry_id = len(self.entries)
+        entry = (
+            slug, package['id'], package['title']['values']['th'],
+            field, configuration_title, str(text), normalized
+        )
+        self.entries.append(entry)
+        # Slugs, ids, titles and field names are shared; only the texts are new
+        self.nbytes += sys.getsizeof(entry) + sys.getsizeof(entry[5]) + sys.getsizeof(normalized) + 8
+        for gram in char_ngrams(normalized, self.n):
+            ids = self.postings.get(gram)
+            if ids is None:
+                ids = self.postings[gram] = []
+                self.nbytes += sys.getsizeof(gram) + sys.getsizeof(ids)
+            ids.append(entry_id)
+            self.nbytes += 8
+
+    def add_category(self, slug: Any, category_json: Dict):
+        for package in category_json.get('packages', []):
+            self.add_entry(slug, package, 'package', package['title']['values']['th'])
+            self.add_entry(slug, package, 'package_id', package['id'])
+            self.add_entry(slug, package, 'description', package['description']['values']['th'])
+            for config in package.get('configurations', []):
+                self.add_entry(slug, package, 'configuration', config.get('title'), config.get('title'))
+                for item in config.get('data', {}).get('items', []):
+                    self.add_entry(slug, package, 'item', item['value'], config.get('title'))
+
+    def candidates(self, query: str) -> set:
+        if len(query) < self.n:
+            # Shorter than one n-gram: every n-gram that contains the query
+            return {entry_id for gram, ids in self.postings.items() if query in gram for entry_id in ids}
+        postings = sorted((self.postings.get(gram, []) for gram in char_ngrams(query, self.n)), key=len)
+        if not postings[0]:
+            return set()
+        found = set(postings[0])
+        for ids in postings[1:]:
+            found.intersection_update(ids)
+            if not found:
+                break
+        return found
+
+    def search(self, query: str, limit: Optional[int] = 50) -> List[Dict]:
+        """Entries containing the query, best field first, then sheet order"""
+        normalized = normalize_search_text(query)
+        if not normalized:
+            return []
+        matches = [
+            entry_id for entry_id in self.candidates(normalized)
+            if normalized in self.entries[entry_id][6]
+        ]
+        matches.sort(key=lambda entry_id: (
+            -SEARCH_FIELD_WEIGHTS[self.entries[entry_id][3]],
+            not self.entries[entry_id][6].startswith(normalized),
+            entry_id
+        ))
+        return [
+            dict(zip(('slug', 'package_id', 'package_title', 'field', 'configuration_title', 'text'),
+                     self.entries[entry_id][:6]))
+            for entry_id in matches[:limit]
+        ]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+def build_search_index(results: Mapping) -> PackageSearchIndex:
+    """Search index over split_by_category results (every category)"""
+    index = PackageSearchIndex()
+    for slug, data in results.items():
+        index.add_category(slug, data['json'])
+    return index
+
+def price_choice_groups(package: Dict) -> List[Tuple[str, List[Tuple[int, Optional[str]]]]]:
+    """
+    Independent price choices of a package as (configuration title, [(price, value)]):
+    one group per RADIO configuration (pick one item; "none" too when not required)
+    and one per CHECKBOX item (taken or not). DATE_TIME_RANGE adds no price.
+    """
+    groups = []
+    for config in package.get('configurations', []):
+        items = config.get('data', {}).get('items', [])
+        title = config.get('title') or config.get('id')
+        if config.get('type') == 'RADIO' and items:
+            choices = [(item.get('additional_price') or 0, item['value']) for item in items]
+            if not config.get('validation', {}).get('required', True):
+                choices.append((0, None))
+            groups.append((title, choices))
+        elif config.get('type') == 'CHECKBOX':
+            for item in items:
+                groups.append((title, [(0, None), (item.get('additional_price') or 0, item['value'])]))
+    return groups
+
+def price_distribution(base_price: int, groups: List[Tuple[str, List[Tuple[int, Optional[str]]]]]) -> Dict[int, int]:
+    """{total price: number of combinations}, built group by group instead of enumerating combinations"""
+    distribution = {base_price: 1}
+    for _title, choices in groups:
+        merged: Dict[int, int] = {}
+        for total, count in distribution.items():
+            for price, _value in choices:
+                merged[total + price] = merged.get(total + price, 0) + count
+        distribution = merged
+    return distribution
+
+def nearest_rank(total_count: int, pct: float) -> int:
+    """1-based nearest-rank index of a percentile: ceil(pct / 100 * N), at least 1"""
+    return max(1, math.ceil(pct / 100 * total_count))
+
+def distribution_percentile(distribution: Dict[int, int], total_count: int, pct: float) -> int:
+    """Nearest-rank percentile of a {price: count} histogram"""
+    rank = nearest_rank(total_count, pct)
+    seen = 0
+    for price in sorted(distribution):
+        seen += distribution[price]
+        if seen >= rank:
+            return price
+    return max(distribution)
+
+def top_price_combinations(base_price: int, groups: List[Tuple[str, List[Tuple[int, Optional[str]]]]],
+                           n: int) -> List[Dict]:
+    """
+    The n most expensive combinations, best first. Each group's choices are
+    sorted by price and a heap expands one group at a time from the most
+    expensive pick, so only about n x groups states are visited.
+    """
+    options = [sorted(choices, key=lambda choice: -choice[0]) for _title, choices in groups]
+    start = (0,) * len(options)
+    heap = [(-(base_price + sum(choices[0][0] for choices in options)), start)]
+    seen = {start}
+    combinations = []
+    while heap and len(combinations) < n:
+        negative_total, state = heapq.heappop(heap)
+        selections: Dict[str, List[str]] = {}
+        for (title, _choices), group_options, index in zip(groups, options, state):
+            value = group_options[index][1]
+            if value is not None:
+                selections.setdefault(title, []).append(value)
+        combinations.append({"price": -negative_total, "selections": selections})
+
+        for group, index in enumerate(state):
+            if index + 1 < len(options[group]):
+                successor = state[:group] + (index + 1,) + state[group + 1:]
+                if successor not in seen:
+                    seen.add(successor)
+                    step = options[group][index][0] - options[group][index + 1][0]
+                    heapq.heappush(heap, (negative_total + step, successor))
+    return combinations
+
+def package_price_summary(package: Dict, top_n: int = 0) -> Dict:
+    """Min/max price, combination count and price distribution of one package"""
+    base_price = package.get('base_price') or 0
+    groups = price_choice_groups(package)
+    distribution = price_distribution(base_price, groups)
+    combinations = sum(distribution.values())
+    summary = {
+        "package_id": package['id'],
+        "title": package['title']['values']['th'],
+        "base_price": base_price,
+        "min_price": min(distribution),
+        "max_price": max(distribution),
+        "combinations": combinations,
+        "price_points": len(distribution),
+        "mean_price": round(sum(price * count for price, count in distribution.items()) / combinations, 2),
+        "p10_price": distribution_percentile(distribution, combinations, 10),
+        "median_price": distribution_percentile(distribution, combinations, 50),
+        "p90_price": distribution_percentile(distribution, combinations, 90)
+    }
+    if top_n:
+        summary["top_combinations"] = top_price_combinations(base_price, groups, top_n)
+    return summary
+
+def category_price_report(category_json: Dict, top_n: int = 0) -> List[Dict]:
+    """package_price_summary for every package of a category ($ref configurations resolved)"""
+    category_json = resolve_configuration_refs(category_json)
+    return [package_price_summary(package, top_n) for package in category_json.get('packages', [])]
+
+PRICE_REPORT_COLUMNS = [
+    'package_id', 'title', 'base_price', 'min_price', 'max_price', 'combinations',
+    'price_points', 'mean_price', 'p10_price', 'median_price', 'p90_price'
+]
+
+def price_report_csv(category_json: Dict, top_n: int = 3) -> bytes:
+    """Price report as CSV (UTF-8 with BOM so Excel shows Thai correctly)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(['category'] + PRICE_REPORT_COLUMNS + (['top_combinations'] if top_n else []))
+    for summary in category_price_report(category_json, top_n):
+        row = [category_json.get('id')] + [summary[column] for column in PRICE_REPORT_COLUMNS]
+        if top_n:
+            row.append(' | '.join(
+                f"{combo['price']}: " + '; '.join(
+                    f"{title} = {', '.join(values)}" for title, values in combo['selections'].items()
+                )
+                for combo in summary['top_combinations']
+            ))
+        writer.writerow(row)
+    return buffer.getvalue().encode('utf-8-sig')
+
+CATALOG_SQLITE_SCHEMA = """
+CREATE TABLE categories (
+    id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL,
+    title_en TEXT,
+    title_th TEXT,
+    cart_limit INTEGER,
+    location_types TEXT,
+    packages_count INTEGER NOT NULL
+);
+CREATE TABLE packages (
+    id INTEGER PRIMARY KEY,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    position INTEGER NOT NULL,
+    package_id TEXT NOT NULL,
+    title_th TEXT,
+    description_th TEXT,
+    base_price INTEGER NOT NULL,
+    min_price INTEGER NOT NULL,
+    max_price INTEGER NOT NULL,
+    quantity_min INTEGER,
+    quantity_max INTEGER,
+    configurations_count INTEGER NOT NULL
+);
+CREATE TABLE configurations (
+    id INTEGER PRIMARY KEY,
+    package_row_id INTEGER NOT NULL REFERENCES packages(id),
+    position INTEGER NOT NULL,
+    configuration_id TEXT,
+    type TEXT NOT NULL,
+    title TEXT,
+    required INTEGER,
+    items_count INTEGER NOT NULL
+);
+CREATE TABLE items (
+    id INTEGER PRIMARY KEY,
+    configuration_row_id INTEGER NOT NULL REFERENCES configurations(id),
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    additional_price INTEGER NOT NULL
+);
+"""
+
+# Built after the bulk insert (one sorted build per index instead of per-row updates)
+CATALOG_SQLITE_INDEXES = """
+CREATE UNIQUE INDEX idx_categories_slug ON categories(slug);
+CREATE INDEX idx_packages_category ON packages(category_id);
+CREATE INDEX idx_packages_package_id ON packages(package_id);
+CREATE INDEX idx_packages_base_price ON packages(base_price);
+CREATE INDEX idx_packages_price_range ON packages(min_price, max_price);
+CREATE INDEX idx_packages_max_price ON packages(max_price);
+CREATE INDEX idx_configurations_package ON configurations(package_row_id);
+CREATE INDEX idx_configurations_type ON configurations(type);
+CREATE INDEX idx_items_configuration ON items(configuration_row_id);
+CREATE INDEX idx_items_additional_price ON items(additional_price);
+"""
+
+SQLITE_BATCH_ROWS = 5000
+
+class CatalogSqliteWriter:
+    """Buffers catalog rows per table and flushes them with executemany in batches"""
+
+    TABLES = {
+        'categories': 7,
+        'packages': 12,
+        'configurations': 8,
+        'items': 5
+    }
+
+    def __init__(self, connection: sqlite3.Connection, batch_size: int = SQLITE_BATCH_ROWS):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.rows: Dict[str, List[Tuple]] = {table: [] for table in self.TABLES}
+        self.counts: Dict[str, int] = {table: 0 for table in self.TABLES}
+        self.slugs = set()
+        self.statements = {
+            table: f"INSERT INTO {table} VALUES ({', '.join('?' * width)})"
+            for table, width in self.TABLES.items()
+        }
+
+    def append(self, table: str, row: Tuple) -> int:
+        """Queue one row; returns its id (ids are assigned here so children never wait for lastrowid)"""
+        self.counts[table] += 1
+        self.rows[table].append((self.counts[table],) + row)
+        if len(self.rows[table]) >= self.batch_size:
+            self.flush(table)
+        return self.counts[table]
+
+    def flush(self, table: Optional[str] = None):
+        # Remaining rows, parents before children
+        for name in ([table] if table else list(self.TABLES)):
+            if self.rows[name]:
+                self.connection.executemany(self.statements[name], self.rows[name])
+                self.rows[name] = []
+
+    def add_category(self, category_json: Dict):
+        category_json = resolve_configuration_refs(category_json)
+        if category_json['id'] in self.slugs:
+            raise ValueError(f"duplicate category slug: {category_json['id']}")
+        self.slugs.add(category_json['id'])
+        title = category_json.get('title', {}).get('values', {})
+        packages = category_json.get('packages', [])
+        category_id = self.append('categories', (
+            category_json['id'],
+            title.get('en'),
+            title.get('th'),
+            category_json.get('cart_limit'),
+            ','.join(category_json.get('service_location_types') or []),
+            len(packages)
+        ))
+        for package_position, package in enumerate(packages):
+            base_price = package.get('base_price') or 0
+            groups = price_choice_groups(package)
+            validation = package.get('quantity', {}).get('validation', {})
+            configurations = package.get('configurations', [])
+            package_row_id = self.append('packages', (
+                category_id,
+                package_position,
+                package['id'],
+                package.get('title', {}).get('values', {}).get('th'),
+                package.get('description', {}).get('values', {}).get('th'),
+                base_price,
+                base_price + sum(min(price for price, _value in choices) for _title, choices in groups),
+                base_price + sum(max(price for price, _value in choices) for _title, choices in groups),
+                validation.get('min'),
+                validation.get('max'),
+                len(configurations)
+            ))
+            for config_position, config in enumerate(configurations):
+                items = config.get('data', {}).get('items', [])
+                required = config.get('validation', {}).get('required')
+                configuration_row_id = self.append('configurations', (
+                    package_row_id,
+                    config_position,
+                    config.get('id'),
+                    config.get('type'),
+                    config.get('title'),
+                    None if required is None else int(required),
+                    len(items)
+                ))
+                for item_position, item in enumerate(items):
+                    self.append('items', (
+                        configuration_row_id,
+                        item_position,
+                        item['value'],
+                        item.get('additional_price') or 0
+                    ))
+
+def export_catalog_sqlite(categories: Iterable[Dict], path: str,
+                          batch_size: int = SQLITE_BATCH_ROWS) -> Dict[str, int]:
+    """
+    Write category JSONs into a fresh SQLite file (categories → packages → configurations → items).
+    Everything is inserted in one transaction with batched executemany, indexes are built at the end.
+    The database is built under a temporary name in the same folder and replaces path only once
+    complete, so a failed export leaves an existing file untouched.
+    Returns row counts per table; raises ValueError when two categories share a slug.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-', suffix='.sqlite')
+    os.close(fd)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        # A new file that is only valid once complete: no rollback journal, no fsync per page
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.executescript(CATALOG_SQLITE_SCHEMA)
+        writer = CatalogSqliteWriter(connection, batch_size)
+        connection.execute("BEGIN")
+        for category_json in categories:
+            writer.add_category(category_json)
+        writer.flush()
+        for statement in CATALOG_SQLITE_INDEXES.strip().splitlines():
+            connection.execute(statement)
+        connection.commit()
+        connection.execute("ANALYZE")
+        connection.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Without a journal a failed export leaves a half-written file; never keep it
+        connection.close()
+        os.remove(tmp_path)
+        raise
+    return dict(writer.counts)
+
+def catalog_sqlite_bytes(categories: Iterable[Dict]) -> Tuple[bytes, Dict[str, int]]:
+    """export_catalog_sqlite into a temporary file; returns (database bytes, row counts)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'catalog.sqlite')
+        counts = export_catalog_sqlite(categories, path)
+        with open(path, 'rb') as f:
+            return f.read(), counts
+
+class CompactResultStore:
+    """
+    Conversion results kept as zlib-compressed minified JSON per category,
+    grouped by upload. Only the selected category is decoded (the last one is
+    cached); older uploads are evicted once the store exceeds its byte budget.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.uploads: "OrderedDict[str, Dict[str, Dict]]" = OrderedDict()
+        # Lazy uploads: categories without a blob yet are converted from here on load
+        self.sources: Dict[str, LazyCategoryResults] = {}
+        self.search_indexes: Dict[str, PackageSearchIndex] = {}
+        self.source_maps: Dict[str, SourceMap] = {}
+        self.decoded_key: Optional[Tuple[str, str]] = None
+        self.decoded_json: Optional[Dict] = None
+        # (upload_key, slug, dedup) -> (encode_category_json output, dedup stats) of the last category shown
+        self.encoded_key: Optional[Tuple[str, str, bool]] = None
+        self.encoded_output: Optional[Tuple[Dict, Optional[Dict]]] = None
+
+    def add(self, upload_key: str, results: Dict[str, Dict],
+            source_map: Optional[SourceMap] = None) -> List[str]:
+        """Store split_by_category results (and optionally their SourceMap) for an upload; returns evicted upload keys"""
+        categories = {}
+        for slug, data in results.items():
+            categories[slug] = {
+                'blob': zlib.compress(dump_json_bytes(data['json'], minify=True)),
+                'category_name': data['category_name'],
+                'subcat_thai': data['subcat_thai'],
+                'packages_count': data['packages_count'],
+                'schema_errors': data['schema_errors']
+            }
+        self.uploads.pop(upload_key, None)
+        self.uploads[upload_key] = categories
+        self.sources.pop(upload_key, None)
+        self.set_source_map(upload_key, source_map)
+        # The search index is built on the first search (see search_index)
+        self.search_indexes.pop(upload_key, None)
+        self.drop_cached(upload_key)
+        return self.evict()
+
+    def add_lazy(self, upload_key: str, results: LazyCategoryResults) -> List[str]:
+        """Store only the category index; each category is converted and compressed on first load"""
+        self.uploads.pop(upload_key, None)
+        self.uploads[upload_key] = {
+            # schema_errors is None until the category is converted
+            slug: {**data, 'blob': None, 'schema_errors': None} for slug, data in results.index.items()
+        }
+        self.sources[upload_key] = results
+        # Filled in by each category's conversion on load
+        self.set_source_map(upload_key, results.source_map)
+        self.search_indexes.pop(upload_key, None)
+        self.drop_cached(upload_key)
+        return self.evict()
+
+    def evict(self) -> List[str]:
+        """Drop oldest uploads until within budget (the newest upload is always kept)"""
+        evicted = []
+        while self.nbytes > self.budget_bytes and len(self.uploads) > 1:
+            upload_key, _categories = self.uploads.popitem(last=False)
+            self.sources.pop(upload_key, None)
+            self.search_indexes.pop(upload_key, None)
+            self.source_maps.pop(upload_key, None)
+            evicted.append(upload_key)
+            self.drop_cached(upload_key)
+        return evicted
+
+    def drop_cached(self, upload_key: str):
+        """Forget the decoded/encoded category cached for an upload that was replaced or evicted"""
+        if self.decoded_key and self.decoded_key[0] == upload_key:
+            self.decoded_key = self.decoded_json = None
+        if self.encoded_key and self.encoded_key[0] == upload_key:
+            self.encoded_key = self.encoded_output = None
+
+    def __contains__(self, upload_key: str) -> bool:
+        return upload_key in self.uploads
+
+    def touch(self, upload_key: str):
+        """Mark an upload as most recently used"""
+        self.uploads.move_to_end(upload_key)
+
+    def index(self, upload_key: str) -> Dict[str, Dict]:
+        """{slug: category_name, subcat_thai, packages_count, schema_errors, nbytes, converted} without decoding anything"""
+        return {
+            slug: {
+                **{k: v for k, v in data.items() if k != 'blob'},
+                'nbytes': len(data['blob'] or b''),
+                'converted': data['blob'] is not None
+            }
+            for slug, data in self.uploads[upload_key].items()
+        }
+
+    def load(self, upload_key: str, slug: str) -> Dict:
+        """Decode one category's JSON (cached until another category is loaded)"""
+        if self.decoded_key != (upload_key, slug):
+            category = self.uploads[upload_key][slug]
+            if category['blob'] is None:
+                # Lazy upload: convert this category now and keep only its compressed bytes
+                source = self.sources[upload_key]
+                self.decoded_json = source[slug]['json']
+                category['schema_errors'] = source[slug]['schema_errors']
+                category['blob'] = zlib.compress(dump_json_bytes(self.decoded_json, minify=True))
+                source.converted.pop(slug)
+                if all(data['blob'] is not None for data in self.uploads[upload_key].values()):
+                    del self.sources[upload_key]
+                self.evict()
+            else:
+                self.decoded_json = json.loads(zlib.decompress(category['blob']))
+            self.decoded_key = (upload_key, slug)
+        return self.decoded_json
+
+    def encoded(self, upload_key: str, slug: str, dedup: bool = False) -> Tuple[Dict, Optional[Dict]]:
+        """
+        encode_category_json of one category (deduplicated first if asked) and the dedup stats,
+        cached until another category or mode is shown
+        """
+        if self.encoded_key != (upload_key, slug, dedup):
+            category_json = self.load(upload_key, slug)
+            dedup_stats = None
+            if dedup:
+                category_json, dedup_stats = deduplicate_configurations(category_json)
+            self.encoded_output = (encode_category_json(category_json), dedup_stats)
+            self.encoded_key = (upload_key, slug, dedup)
+            self.evict()
+        return self.encoded_output
+
+    def schema_errors(self, upload_key: str, slug: str) -> List[Dict[str, str]]:
+        """Schema validation errors of one category (a lazy category is converted first)"""
+        self.load(upload_key, slug)
+        return self.uploads[upload_key][slug]['schema_errors']
+
+    def search_index(self, upload_key: str) -> PackageSearchIndex:
+        """Search index of an upload, built on first use (lazy uploads convert their remaining categories)"""
+        index = self.search_indexes.get(upload_key)
+        if index is None:
+            index = PackageSearchIndex()
+            for slug in self.uploads[upload_key]:
+                index.add_category(slug, self.load(upload_key, slug))
+            self.search_indexes[upload_key] = index
+            # The index counts against the budget, so older uploads may have to go
+            self.evict()
+        return index
+
+    def set_source_map(self, upload_key: str, source_map: Optional[SourceMap]):
+        if source_map is None:
+            self.source_maps.pop(upload_key, None)
+        else:
+            self.source_maps[upload_key] = source_map
+
+    def source_map(self, upload_key: str, slug: Optional[str] = None) -> Optional[SourceMap]:
+        """SourceMap of an upload (None if converted without one); a slug of a lazy upload is converted first"""
+        if slug is not None and upload_key in self.source_maps:
+            self.load(upload_key, slug)
+        return self.source_maps.get(upload_key)
+
+    def upload_nbytes(self, upload_key: str) -> int:
+        source_map = self.source_maps.get(upload_key)
+        source = self.sources.get(upload_key)
+        search_index = self.search_indexes.get(upload_key)
+        encoded_nbytes = 0
+        if self.encoded_key and self.encoded_key[0] == upload_key:
+            encoded = self.encoded_output[0]
+            encoded_nbytes = (len(encoded['minified']) + len(encoded.get('pretty', b''))
+                              + sum(len(payload) for payload in encoded['compressed'].values()))
+        return (sum(len(data['blob'] or b'') for data in self.uploads[upload_key].values())
+                + (source_map.nbytes if source_map is not None else 0)
+                + (source.nbytes if source is not None else 0)
+                + (search_index.nbytes if search_index is not None else 0)
+                + encoded_nbytes)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self.upload_nbytes(upload_key) for upload_key in self.uploads)
+
+# Columns the converter reads (plus the "Subcat thai" variant found by find_subcat_column);
+# everything else in the sheet is dropped at read time
+CONVERTER_COLUMNS = [
+    header for header in MINT_HEADERS
+    if header not in ('Location type', 'marketplace subcategory')
+]
+
+# Excel engines per extension, fastest first; only installed ones are used. A static order
+# rather than a timing probe: sampling a few rows favours openpyxl (it streams rows, while
+# calamine loads the whole sheet), yet calamine reads full workbooks several times faster
+EXCEL_ENGINES = {
+    'xlsx': ['calamine', 'openpyxl'],
+    'xlsm': ['calamine', 'openpyxl'],
+    'xls': ['calamine', 'xlrd'],
+    'ods': ['calamine', 'odf'],
+}
+ENGINE_MODULES = {'calamine': 'python_calamine', 'openpyxl': 'openpyxl', 'xlrd': 'xlrd', 'odf': 'odf'}
+
+def is_converter_column(header) -> bool:
+    if not isinstance(header, str):
+        return False
+    name = header.strip()
+    return name in CONVERTER_COLUMNS or find_subcat_column([name]) is not None
+
+def prune_mint_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep only the columns whose header (row 0) the converter reads (sheet positions in attrs['source_columns'])"""
+    if df.empty:
+        return df
+    keep = [is_converter_column(header) for header in df.iloc[0].tolist()]
+    pruned = df.loc[:, keep]
+    pruned.attrs['source_columns'] = [position for position, kept in enumerate(keep) if kept]
+    return pruned
+
+def available_excel_engines(file_extension: str) -> List[str]:
+    engines = EXCEL_ENGINES.get(file_extension, EXCEL_ENGINES['xlsx'])
+    return [engine for engine in engines if importlib.util.find_spec(ENGINE_MODULES[engine]) is not None]
+
+def read_excel_auto(data: bytes, file_extension: str) -> Tuple[str, pd.DataFrame]:
+    """Read with the fastest installed engine, falling back to the others if it cannot read this file"""
+    engines = available_excel_engines(file_extension)
+    if not engines:
+        return 'default', pd.read_excel(io.BytesIO(data), dtype=str)
+    for engine in engines:
+        try:
+            return engine, pd.read_excel(io.BytesIO(data), engine=engine, dtype=str)
+        except Exception as e:
+            last_error = e
+    raise last_error
+
+def read_mint_csv(data: bytes, prune_columns: bool = True) -> pd.DataFrame:
+    """Read a Mint CSV as strings; usecols comes from the header row so pruned columns are never parsed"""
+    usecols = None
+    if prune_columns:
+        head = pd.read_csv(io.BytesIO(data), header=None, nrows=2, dtype=str)
+        if len(head) > 1:
+            usecols = [position for position, header in enumerate(head.iloc[1].tolist())
+                       if is_converter_column(header)]
+    df = pd.read_csv(io.BytesIO(data), usecols=usecols, dtype=str)
+    if usecols is not None:
+        df.attrs['source_columns'] = usecols
+    return df
+
+def read_mint_file(file, filename: str, engine: str = 'auto', prune_columns: bool = True) -> pd.DataFrame:
+    """
+    Read an uploaded Mint workbook (Excel or CSV, chosen by file extension) as strings.
+    engine='auto' picks the fastest installed Excel engine (e.g. calamine when
+    python-calamine is installed); prune_columns keeps only the columns the
+    converter reads. The engine used is recorded in df.attrs['reader_engine'].
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            data = f.read()
+    else:
+        data = file.getvalue() if hasattr(file, 'getvalue') else file.read()
+
+    file_extension = filename.split('.')[-1].lower()
+    if file_extension == 'csv':
+        df = read_mint_csv(data, prune_columns)
+        engine = 'c'
+    else:
+        if engine == 'auto':
+            engine, df = read_excel_auto(data, file_extension)
+        else:
+            df = pd.read_excel(io.BytesIO(data), engine=engine, dtype=str)
+        if prune_columns:
+            df = prune_mint_columns(df)
+    df.attrs['reader_engine'] = engine
+    return df
+
+def iter_split_by_category(df: pd.DataFrame, cancel: Optional[Callable[[], bool]] = None,
+                           source_map: bool = False) -> Iterator[Dict]:
+    """
+    split_by_category one category at a time, yielding after each:
+    {slug, result, categories_done, categories_total, rows_done, rows_total, elapsed, source_map}.
+    cancel() is checked between categories; once it returns True the generator
+    stops, and every category already yielded is complete.
+    """
+    started = time.perf_counter()
+    results = LazyCategoryResults(df, source_map=source_map)
+    # One parse for the whole sheet (repeated option blocks parsed once), sliced per category
+    config_items = parse_configuration_column(
+        mint_column(results.df_data, 'Package Detail selection ( Configuration )')
+    ).tolist()
+    # An info row can be shared by two categories; count each row once
+    seen = np.zeros(len(results.df_data), dtype=bool)
+    rows_done = 0
+    for categories_done, slug in enumerate(results, start=1):
+        if cancel is not None and cancel():
+            return
+        rows = results.category_rows[slug]
+        result = results.convert(slug, [config_items[position] for position in rows])
+        rows_done += int(np.count_nonzero(~seen[rows]))
+        seen[rows] = True
+        yield {
+            'slug': slug,
+            'result': result,
+            'categories_done': categories_done,
+            'categories_total': len(results),
+            'rows_done': rows_done,
+            'rows_total': len(results.df_data),
+            'elapsed': time.perf_counter() - started,
+            'source_map': results.source_map
+        }
+
+def split_by_category(df, lazy: bool = False, workers: int = 0, progress: bool = False,
+                      cancel: Optional[Callable[[], bool]] = None):
+    """
+    แยก JSON ตาม Category slug
+    lazy=True: แปลงทีละ category เมื่อถูกเรียกใช้; workers > 1: แบ่ง category ไปแปลงหลาย process
+    progress=True: generator ที่ yield ผลทีละ category พร้อม progress (ดู iter_split_by_category);
+    cancel() คืน True เพื่อหยุดระหว่าง category
+    """
+    if progress:
+        return iter_split_by_category(df, cancel)
+    if lazy:
+        return LazyCategoryResults(df)
+    if workers > 1:
+        return convert_mint_frame_sharded(df, workers)["categories"]
+    return convert_mint_frame(df)["categories"]
+
+def encode_workbook(data: bytes, filename: str, dedup: bool = False, minify: bool = False,
+                    precompress: bool = False, slugs: Optional[List[str]] = None,
+                    workers: int = 0) -> Dict[str, Dict]:
+    """
+    Convert workbook bytes and encode every category (e.g. inside a worker process),
+    or only the given slugs (the other categories are never converted).
+    workers > 1 shards a full conversion across that many processes.
+    Returns {slug: {'json': bytes, 'compressed': {suffix: bytes}, 'sizes': {...}}}.
+    """
+    df = read_mint_file(io.BytesIO(data), filename)
+    results = split_by_category(df, lazy=slugs is not None, workers=workers)
+    outputs = {}
+    for slug in (results if slugs is None else [slug for slug in slugs if slug in results]):
+        category_json = results[slug]['json']
+        if dedup:
+            category_json, _stats = deduplicate_configurations(category_json)
+        encoded = encode_category_json(category_json, pretty=not minify, precompress=precompress)
+        outputs[slug] = {
+            'json': encoded['minified'] if minify else encoded['pretty'],
+            'compressed': encoded['compressed'],
+            'sizes': encoded['sizes']
+        }
+    return outputs
+
+def convert_workbook_bytes(data: bytes, filename: str, dedup: bool = False,
+                           minify: bool = False) -> Dict[str, bytes]:
+    """Convert workbook bytes to {slug: UTF-8 encoded JSON}, e.g. inside a worker process"""
+    encoded = encode_workbook(data, filename, dedup=dedup, minify=minify)
+    return {slug: output['json'] for slug, output in encoded.items()}
+
+def workbook_output_files(encoded: Dict[str, Dict]) -> Dict[str, bytes]:
+    """Flatten encode_workbook results to {"slug.json": bytes, "slug.json.gz": bytes, ...}"""
+    files = {}
+    for slug, output in encoded.items():
+        files[f"{slug}.json"] = output['json']
+        for suffix, payload in output['compressed'].items():
+            files[f"{slug}.json{suffix}"] = payload
+    return files
 
 def main():
     st.set_page_config(page_title="Mint Excel to JSON Converter", page_icon="📊", layout="wide")
@@ -385,7 +2283,7 @@ def main():
     if uploaded_file is not None:
         try:
             # Read Excel file
-            df = pd.read_excel(uploaded_file)
+            df = read_mint_file(uploaded_file, uploaded_file.name)
             
             st.success(f"✅ อ่านไฟล์สำเร็จ! พบ {df.shape[0]} แถว, {df.shape[1]} คอลัมน์")
             
@@ -0,0 +1,57 @@
+"""
+Mint SQLite Export
+Workbook หรือ Service Definition JSON → ไฟล์ SQLite สำหรับ query ราคา/ตัวเลือกข้าม category
+
+- ตาราง categories → packages → configurations → items (อ้างอิงกันด้วย id)
+- packages มี base_price, min_price, max_price (ช่วงราคาจาก RADIO/CHECKBOX)
+- index: slug, package_id, configuration type, ราคา
+- insert แบบ batch ใน transaction เดียว แล้วค่อยสร้าง index ตอนท้าย
+- รับได้ทั้ง workbook (.xlsx/.xls/.csv) และ JSON (category เดียว หรือ {slug: category}, รองรับ $ref)
+
+Run:
+    python mint_export_sqlite.py catalog.sqlite "Mint test form.xlsx" massage.json ...
+
+ตัวอย่าง query:
+    SELECT c.slug, p.title_th, p.min_price, p.max_price
+    FROM packages p JOIN categories c ON c.id = p.category_id
+    WHERE p.max_price > 1000 ORDER BY p.max_price DESC;
+"""
+
+import argparse
+import os
+import time
+from typing import Dict, Iterable, Iterator
+
+from mint_excel_to_json_converter_lib import export_catalog_sqlite, read_mint_file, split_by_category
+from mint_json_to_excel import iter_category_jsons
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm', '.xls', '.csv')
+
+def iter_input_categories(paths: Iterable[str]) -> Iterator[Dict]:
+    """Category JSONs from workbooks (converted one category at a time) and JSON files"""
+    for path in paths:
+        if path.lower().endswith(WORKBOOK_EXTENSIONS):
+            with open(path, 'rb') as f:
+                df = read_mint_file(f, os.path.basename(path))
+            for data in split_by_category(df, lazy=True).values():
+                yield data['json']
+        else:
+            yield from iter_category_jsons([path])
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Mint catalogs to an indexed SQLite database")
+    parser.add_argument('output', help="ไฟล์ .sqlite ปลายทาง (เขียนทับ)")
+    parser.add_argument('inputs', nargs='+', help="workbook (.xlsx/.xls/.csv) หรือไฟล์ JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        counts = export_catalog_sqlite(iter_input_categories(args.inputs), args.output)
+    except ValueError as e:
+        parser.exit(1, f"❌ {e}\n")
+    print(f"✅ {counts['categories']} categories, {counts['packages']} packages, "
+          f"{counts['configurations']} configurations, {counts['items']} items "
+          f"→ {args.output} ({time.perf_counter() - started:.2f}s)")
+
+if __name__ == "__main__":
+    main()
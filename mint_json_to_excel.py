@@ -0,0 +1,123 @@
+"""
+Mint JSON to Excel (reverse converter)
+Service Definition JSON (จาก split_by_category) → Excel รูปแบบ Mint ที่แก้ไขแล้วแปลงกลับได้
+
+- รับได้ทั้งไฟล์ category เดียว ({"id": ..., "packages": [...]})
+  หรือไฟล์รวม {slug: category_json} (เช่น output ของ /convert?format=json)
+- รองรับไฟล์แบบ $ref (definitions.configurations) โดยแตกกลับเป็น configuration เต็ม
+- 1 package = 1 แถว, configuration ที่ 2 เป็นต้นไปอยู่ในแถวต่อเนื่อง (Package Name ว่าง)
+- ตัวเลือกเขียนเป็น "- value +N THB" ให้ parse_configuration_text อ่านกลับได้
+- ใช้ openpyxl write-only workbook เขียนทีละแถว ไม่ต้องถือทั้ง sheet ไว้ใน memory
+
+Run:
+    python mint_json_to_excel.py output.xlsx cleaning.json massage.json ...
+"""
+
+import argparse
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+
+from openpyxl import Workbook
+
+from mint_excel_to_json_converter_lib import MINT_HEADERS, resolve_configuration_refs
+
+SHEET_TITLE = "Mint service definitions (generated from JSON)"
+
+def format_configuration_text(items: List[Dict]) -> str:
+    """Inverse of parse_configuration_text: one "- value +N THB" line per item"""
+    lines = []
+    for item in items:
+        line = f"- {item['value']}"
+        if item.get('additional_price'):
+            line += f" +{item['additional_price']} THB"
+        lines.append(line)
+    return '\n'.join(lines)
+
+def configuration_cells(config: Dict) -> Dict[str, Any]:
+    return {
+        'Configurations.title': config.get('title'),
+        'Package Detail selection ( Configuration )': format_configuration_text(config.get('data', {}).get('items', [])) or None,
+        'Configurations.id': config.get('id'),
+        'Configurations.type': config.get('type')
+    }
+
+def category_rows(category_json: Dict) -> Iterator[List[Any]]:
+    """Yield Mint rows (in MINT_HEADERS order) for one category"""
+    location_types = ', '.join(category_json.get('service_location_types') or ['AT_PIN'])
+    title = category_json.get('title', {}).get('values', {})
+
+    for pkg_index, pkg in enumerate(category_json.get('packages', [])):
+        validation = pkg.get('quantity', {}).get('validation', {})
+        row = {
+            'Package Name': pkg['title']['values']['th'],
+            'Package Id': pkg['id'],
+            'Package Description': pkg.get('description', {}).get('values', {}).get('th'),
+            'Starting price': pkg.get('base_price', 0),
+            'min': validation.get('min', 1),
+            'max': validation.get('max', 10),
+            'quantity.placeholder': pkg.get('quantity', {}).get('placeholder', {}).get('values', {}).get('th'),
+            'other text field - placeholder': pkg.get('note', {}).get('placeholder'),
+            'service_location_types': location_types,
+            'Configurations.type': 'NONE'
+        }
+        # Category info only on the first row; later rows inherit the slug
+        if pkg_index == 0:
+            row.update({
+                'Category': title.get('en'),
+                'Subcat thai': title.get('th'),
+                'Category slug': category_json['id'],
+                'Cart limit': category_json.get('cart_limit')
+            })
+
+        configurations = pkg.get('configurations', [])
+        if configurations:
+            row.update(configuration_cells(configurations[0]))
+        yield [row.get(header) for header in MINT_HEADERS]
+
+        # Continuation rows: Package Name empty → belongs to the package above
+        for config in configurations[1:]:
+            cells = configuration_cells(config)
+            yield [cells.get(header) for header in MINT_HEADERS]
+
+def iter_category_jsons(paths: Iterable[str]) -> Iterator[Dict]:
+    """Load category JSONs one file at a time (single category or {slug: category} maps)"""
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict) and 'packages' in data:
+            categories = [data]
+        elif isinstance(data, dict):
+            categories = data.values()
+        else:
+            categories = data
+        for category_json in categories:
+            yield resolve_configuration_refs(category_json)
+
+def write_mint_workbook(categories: Iterable[Dict], output) -> int:
+    """Stream categories into a Mint-format workbook; returns number of data rows written"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Mint form")
+    # The converter reads df.iloc[0] as headers, so headers go on the second sheet row
+    sheet.append([SHEET_TITLE])
+    sheet.append(MINT_HEADERS)
+
+    row_count = 0
+    for category_json in categories:
+        for row in category_rows(category_json):
+            sheet.append(row)
+            row_count += 1
+
+    workbook.save(output)
+    return row_count
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert service-definition JSON back to a Mint workbook")
+    parser.add_argument('output', help="ไฟล์ .xlsx ปลายทาง")
+    parser.add_argument('inputs', nargs='+', help="ไฟล์ JSON (category เดียว หรือ {slug: category})")
+    args = parser.parse_args()
+
+    row_count = write_mint_workbook(iter_category_jsons(args.inputs), args.output)
+    print(f"✅ เขียน {row_count} แถว → {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Mint Watch Folder
+Long-running watcher: บันทึก workbook ในโฟลเดอร์ → แปลงเป็น JSON แยกตาม category อัตโนมัติ
+
+- ตรวจโฟลเดอร์ทุก --poll-interval วินาที (stdlib เท่านั้น ไม่ต้องติดตั้ง watcher เพิ่ม)
+- รอให้ไฟล์นิ่ง (ขนาด/เวลาแก้ไขไม่เปลี่ยน) --debounce วินาที ก่อนแปลง กันการบันทึกรัวๆ
+- แปลงเฉพาะไฟล์ที่เปลี่ยน ใน worker process ที่เปิดค้างไว้ (import pandas/converter ไว้แล้ว)
+- เขียนผลลัพธ์แบบ atomic ไปที่ <ชื่อไฟล์>_json/<slug>.json ข้างไฟล์ต้นฉบับ
+- --minify / --precompress สำหรับ pipeline ที่ส่งขึ้น CDN (<slug>.json.gz, .br, .zst)
+- หลังแปลงสำเร็จ ลบ <slug>.json (.gz/.br/.zst) ของ category ที่ไม่มีใน workbook แล้ว
+- ถ้า worker process ตาย (OOM/crash) จะเริ่ม worker ใหม่แล้วแปลงไฟล์นั้นอีกครั้ง
+
+Run:
+    python mint_watch_folder.py /path/to/shared-folder --debounce 0.5
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from mint_excel_to_json_converter_lib import COMPRESSION_NAMES, encode_workbook, workbook_output_files
+
+WATCH_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+# Files the converter writes into an output folder; anything else there is left alone
+OUTPUT_SUFFIXES = ('.json', *(f'.json{suffix}' for suffix in COMPRESSION_NAMES))
+
+def is_workbook(filename: str) -> bool:
+    """True for Mint workbooks, ignoring Excel/LibreOffice lock and temp files"""
+    if filename.startswith(('~$', '.~lock', '.')):
+        return False
+    return filename.lower().endswith(WATCH_EXTENSIONS)
+
+def output_dir_for(path: str) -> str:
+    """Output folder written next to the workbook"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(os.path.dirname(path), f"{stem}_json")
+
+def worker_ready() -> bool:
+    """No-op task; importing this module in the worker loads pandas and the converter"""
+    return True
+
+def convert_workbook_file(path: str, minify: bool = False, precompress: bool = False) -> Dict[str, bytes]:
+    """Read and convert one workbook to {output filename: bytes} (runs inside the worker process)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    encoded = encode_workbook(data, os.path.basename(path), minify=minify, precompress=precompress)
+    return workbook_output_files(encoded)
+
+def write_atomically(path: str, payload: bytes):
+    """Write via a temp file in the same folder + os.replace, so readers never see partial JSON"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def remove_stale_outputs(out_dir: str, keep: Iterable[str]) -> List[str]:
+    """Delete converter outputs (<slug>.json, .json.gz, ...) not in keep, e.g. of a removed category"""
+    keep = set(keep)
+    removed = []
+    with os.scandir(out_dir) as entries:
+        for entry in entries:
+            if (entry.is_file() and not entry.name.startswith('.')
+                    and entry.name.endswith(OUTPUT_SUFFIXES) and entry.name not in keep):
+                os.remove(entry.path)
+                removed.append(entry.path)
+    return removed
+
+def write_outputs(files: Dict[str, bytes], out_dir: str) -> List[str]:
+    """Write each output file atomically, remove outputs no longer produced and return the written paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name, payload in files.items():
+        target = os.path.join(out_dir, name)
+        write_atomically(target, payload)
+        written.append(target)
+    remove_stale_outputs(out_dir, files)
+    return written
+
+class FolderWatcher:
+    """Polls a folder, debounces saves and reconverts changed workbooks in a warm worker"""
+
+    def __init__(self, folder: str, debounce: float = 0.5, poll_interval: float = 0.2,
+                 minify: bool = False, precompress: bool = False,
+                 executor: Optional[ProcessPoolExecutor] = None):
+        self.folder = os.path.abspath(folder)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.minify = minify
+        self.precompress = precompress
+        self.executor = executor or self.new_executor()
+        self.signatures: Dict[str, Tuple[int, int]] = {}
+        self.pending: Dict[str, float] = {}
+        # path -> (future, start time, executor it was submitted to)
+        self.running: Dict[str, Tuple[Future, float, ProcessPoolExecutor]] = {}
+
+    def new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def warm_up(self):
+        """Start the worker and import the converter before the first save arrives"""
+        self.executor.submit(worker_ready).result()
+
+    def replace_broken_executor(self, broken: ProcessPoolExecutor):
+        """A dead worker (OOM, crash) breaks the pool for good; start and warm a fresh one once"""
+        if self.executor is not broken:
+            return
+        print("⚠️ worker process died, restarting it")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = self.new_executor()
+        self.warm_up()
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """Current (mtime_ns, size) of every workbook in the folder"""
+        found = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and is_workbook(entry.name):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    found[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def queue_stale_outputs(self):
+        """On startup, queue workbooks whose outputs are missing or older than the workbook"""
+        now = time.monotonic()
+        for path, (mtime_ns, _size) in self.signatures.items():
+            out_dir = output_dir_for(path)
+            if not os.path.isdir(out_dir) or os.stat(out_dir).st_mtime_ns < mtime_ns:
+                self.pending[path] = now - self.debounce
+
+    def poll(self, now: Optional[float] = None) -> List[str]:
+        """Record changes and dispatch workbooks that have been stable for the debounce window"""
+        now = time.monotonic() if now is None else now
+        current = self.scan()
+        for path, signature in current.items():
+            if self.signatures.get(path) != signature:
+                self.signatures[path] = signature
+                self.pending[path] = now
+        for path in list(self.signatures):
+            if path not in current:
+                del self.signatures[path]
+                self.pending.pop(path, None)
+
+        dispatched = []
+        for path, changed_at in list(self.pending.items()):
+            # One conversion per file at a time; a save during conversion stays pending
+            if path in self.running or now - changed_at < self.debounce:
+                continue
+            executor = self.executor
+            try:
+                future = executor.submit(convert_workbook_file, path, self.minify, self.precompress)
+            except BrokenProcessPool:
+                # Stays pending and is dispatched to the new worker
+                self.replace_broken_executor(executor)
+                continue
+            del self.pending[path]
+            self.running[path] = (future, time.perf_counter(), executor)
+            dispatched.append(path)
+        return dispatched
+
+    def collect(self) -> List[Tuple[str, Optional[List[str]], float]]:
+        """Write finished conversions; returns (workbook, written paths or None on error, seconds)"""
+        finished = []
+        for path, (future, started, executor) in list(self.running.items()):
+            if not future.done():
+                continue
+            del self.running[path]
+            try:
+                written = write_outputs(future.result(), output_dir_for(path))
+            except BrokenProcessPool:
+                # The worker died mid-conversion: retry on a fresh worker (a newer save wins)
+                self.replace_broken_executor(executor)
+                self.pending.setdefault(path, time.monotonic() - self.debounce)
+                continue
+            except Exception as e:
+                print(f"❌ {os.path.basename(path)}: {e}")
+                written = None
+            finished.append((path, written, time.perf_counter() - started))
+        return finished
+
+    def run(self):
+        self.warm_up()
+        self.signatures = self.scan()
+        self.queue_stale_outputs()
+        print(f"👀 Watching {self.folder} (debounce {self.debounce}s)")
+        while True:
+            self.poll()
+            for path, written, seconds in self.collect():
+                if written is not None:
+                    print(f"✅ {os.path.basename(path)} → {len(written)} files ({seconds:.2f}s)")
+            time.sleep(self.poll_interval)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a folder and reconvert Mint workbooks on save")
+    parser.add_argument('folder')
+    parser.add_argument('--debounce', type=float, default=0.5,
+                        help="วินาทีที่ไฟล์ต้องนิ่งก่อนแปลง")
+    parser.add_argument('--poll-interval', type=float, default=0.2)
+    parser.add_argument('--minify', action='store_true', help="เขียน JSON แบบ minified")
+    parser.add_argument('--precompress', action='store_true',
+                        help="เขียน .json.gz (+ .br/.zst ถ้าติดตั้ง) เพิ่ม")
+    args = parser.parse_args()
+
+    watcher = FolderWatcher(args.folder, debounce=args.debounce, poll_interval=args.poll_interval,
+                            minify=args.minify, precompress=args.precompress)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+if __name__ == "__main__":
+    main()